@@ -1,9 +1,11 @@
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 
 class StaticURLTests(TestCase):
     """Класс для проверки статичиских страниц"""
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_all_url_exists_at_desired_location(self):
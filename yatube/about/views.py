@@ -1,3 +1,4 @@
+from core.middleware import add_surrogate_keys
 from django.core.mail import send_mail
 from django.shortcuts import redirect, render
 from django.views.generic.base import TemplateView
@@ -5,19 +6,27 @@ from django.views.generic.base import TemplateView
 from .forms import WishMeForm
 
 
-# Create your views here.
-class AboutAuthorView(TemplateView):
+class CachedPageMixin:
+    """Разрешает кэшировать страницу целиком для анонимных посетителей."""
+    surrogate_keys = ('about',)
+
+    def get(self, request, *args, **kwargs):
+        add_surrogate_keys(request, *self.surrogate_keys)
+        return super().get(request, *args, **kwargs)
+
+
+class AboutAuthorView(CachedPageMixin, TemplateView):
     """Класс статичной страницы с наполнение 'Об авторе'."""
     template_name = "about/author.html"
 
 
-class AboutTechView(TemplateView):
+class AboutTechView(CachedPageMixin, TemplateView):
     """Класс статичной страницы с наполнение 'Технологии'."""
     template_name = "about/tech.html"
 
 
 def send_msg(name, email, comment):
-    """Функция отправки сообщения."""
+    """Ставит письмо с пожеланием в очередь на отправку."""
     subject = f"Тебе пришло пожелание от {name}"
     body = f"""
     Вот что он тебе пожелал: {comment}
@@ -39,7 +48,7 @@ def wish_me(request):
         if form.is_valid():
             send_msg(
                 name=form.cleaned_data['name'],
-                email=form.cleaned_data['comment'],
+                email=form.cleaned_data['email'],
                 comment=form.cleaned_data['comment'],
             )
             return redirect('/about/thank_you/')
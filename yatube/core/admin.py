@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Класс для просмотра очереди исходящих писем в админке."""
+    list_display = ('pk', 'subject', 'created', 'attempts',
+                    'next_attempt_at', 'sent_at',)
+    search_fields = ('subject', 'recipients',)
+    list_filter = ('sent_at', 'created',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
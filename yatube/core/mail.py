@@ -0,0 +1,163 @@
+import base64
+import json
+import uuid
+from datetime import timedelta
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который не отправляет письма, а складывает их
+    в таблицу OutboxMessage. Отправляет их команда send_outbox через
+    настоящий бэкенд OUTBOX_EMAIL_BACKEND.
+
+    Сохраняются текст, HTML-версия, заголовки и вложения-файлы.
+    Вложения, собранные как готовые MIME-части, очередь не принимает."""
+
+    def send_messages(self, email_messages):
+        now = timezone.now()
+        queued = []
+        for message in email_messages:
+            html_body = ''
+            for content, mimetype in getattr(message, 'alternatives', []):
+                if mimetype == 'text/html':
+                    html_body = content
+            queued.append(OutboxMessage(
+                subject=message.subject,
+                body=message.body,
+                html_body=html_body,
+                from_email=message.from_email,
+                recipients=json.dumps({
+                    'to': message.to,
+                    'cc': message.cc,
+                    'bcc': message.bcc,
+                    'reply_to': message.reply_to,
+                }),
+                headers=json.dumps(message.extra_headers),
+                attachments=json.dumps(
+                    [dump_attachment(item) for item in message.attachments]
+                ),
+                next_attempt_at=now,
+            ))
+        OutboxMessage.objects.bulk_create(queued)
+        return len(queued)
+
+
+def dump_attachment(attachment):
+    """Вложение в виде, пригодном для JSON: имя, содержимое в base64
+    и тип."""
+    if isinstance(attachment, MIMEBase):
+        raise ValueError('Очередь писем не принимает вложения MIMEBase')
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode(), mimetype]
+
+
+def build_message(outbox_message, connection):
+    """Собирает письмо для отправки из записи очереди."""
+    recipients = json.loads(outbox_message.recipients)
+    message = EmailMultiAlternatives(
+        subject=outbox_message.subject,
+        body=outbox_message.body,
+        from_email=outbox_message.from_email,
+        headers=json.loads(outbox_message.headers or '{}'),
+        connection=connection,
+        **recipients,
+    )
+    for filename, content, mimetype in json.loads(
+            outbox_message.attachments or '[]'):
+        message.attach(filename, base64.b64decode(content), mimetype)
+    if outbox_message.html_body:
+        message.attach_alternative(outbox_message.html_body, 'text/html')
+    return message
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей,
+    но не больше OUTBOX_RETRY_MAX_DELAY секунд."""
+    delay = settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.OUTBOX_RETRY_MAX_DELAY))
+
+
+def pending_messages():
+    """Неотправленные письма, время следующей попытки которых пришло."""
+    return OutboxMessage.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+        next_attempt_at__lte=timezone.now(),
+    )
+
+
+def claim_batch(batch_size):
+    """Забирает до batch_size готовых писем для одного отправщика.
+
+    Одно UPDATE заново проверяет, что письмо ещё ждёт отправки, ставит
+    ему метку и откладывает следующую попытку на OUTBOX_CLAIM_TIMEOUT
+    секунд. Параллельный send_outbox эти письма уже не выберет, а если
+    отправщик упадёт, письма вернутся в очередь по истечении срока."""
+    token = uuid.uuid4().hex
+    pks = list(pending_messages().values_list('pk', flat=True)[:batch_size])
+    pending_messages().filter(pk__in=pks).update(
+        claim_token=token,
+        next_attempt_at=(
+            timezone.now()
+            + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT)
+        ),
+    )
+    return list(OutboxMessage.objects.filter(claim_token=token))
+
+
+def send_batch(batch_size):
+    """Отправляет до batch_size писем из очереди через одно соединение.
+
+    Неудачная отправка не останавливает пачку: письму увеличивается
+    счётчик попыток и назначается следующая попытка с экспоненциальной
+    задержкой. Возвращает пару (отправлено, ошибок)."""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+    sent = failed = 0
+    connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    try:
+        connection.open()
+        for outbox_message in batch:
+            try:
+                connection.send_messages(
+                    [build_message(outbox_message, connection)]
+                )
+            except Exception as error:
+                outbox_message.attempts += 1
+                outbox_message.last_error = repr(error)
+                outbox_message.next_attempt_at = (
+                    timezone.now() + retry_delay(outbox_message.attempts)
+                )
+                failed += 1
+            else:
+                outbox_message.attempts += 1
+                outbox_message.sent_at = timezone.now()
+                outbox_message.last_error = ''
+                sent += 1
+    except Exception as error:
+        # Не удалось даже открыть соединение: откладываем всю пачку.
+        for outbox_message in batch[sent + failed:]:
+            outbox_message.attempts += 1
+            outbox_message.last_error = repr(error)
+            outbox_message.next_attempt_at = (
+                timezone.now() + retry_delay(outbox_message.attempts)
+            )
+            failed += 1
+    finally:
+        connection.close()
+    for outbox_message in batch:
+        outbox_message.claim_token = ''
+    OutboxMessage.objects.bulk_update(batch, [
+        'attempts', 'next_attempt_at', 'sent_at', 'last_error', 'claim_token'
+    ])
+    return sent, failed
@@ -0,0 +1,175 @@
+import hashlib
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+PAGE_CACHE_KEY = 'anonymous_page:{}'
+SURROGATE_KEY = 'surrogate_key:{}'
+# Параметры, от которых зависит содержимое страницы. Запросы с другими
+# параметрами не кэшируются: иначе каждая новая строка запроса
+# занимала бы в кэше отдельную запись.
+PAGE_CACHE_PARAMS = ('page', 'after', 'before', 'q')
+CONDITIONAL_HEADERS = ('ETag', 'Last-Modified')
+HOLE_RE = re.compile(
+    r'<!--hole:(?P<template>[\w/.-]+)-->.*?<!--/hole-->', re.S
+)
+
+
+def add_surrogate_keys(request, *keys):
+    """Помечает ответ ключами, по которым его можно сбросить из кэша.
+
+    Кэшируются только страницы, для которых вызвана эта функция.
+    Версии ключей запоминаются сейчас, до отрисовки: сброс, случившийся
+    во время неё, сделает сохранённую страницу устаревшей."""
+    if not hasattr(request, 'surrogate_keys'):
+        request.surrogate_keys = set()
+        request.surrogate_key_versions = {}
+    new_keys = set(keys) - request.surrogate_keys
+    request.surrogate_keys.update(new_keys)
+    if new_keys:
+        request.surrogate_key_versions.update(
+            surrogate_key_versions(new_keys)
+        )
+
+
+def purge_surrogate_keys(*keys):
+    """Сбрасывает все страницы, помеченные любым из ключей.
+
+    У каждого ключа есть версия, а страница в кэше помнит версии своих
+    ключей. Сброс атомарно увеличивает версию, и страницы со старой
+    версией больше не отдаются."""
+    for key in keys:
+        try:
+            cache.incr(SURROGATE_KEY.format(key))
+        except ValueError:
+            # Версии нет в кэше: страницы с этим ключом и так устарели.
+            pass
+
+
+def surrogate_key_versions(keys):
+    """Текущие версии ключей. Отсутствующая версия заводится заново
+    со значением от текущего времени, чтобы не совпасть с версией,
+    которую помнят старые страницы."""
+    tag_keys = [SURROGATE_KEY.format(key) for key in keys]
+    versions = cache.get_many(tag_keys)
+    for tag_key in set(tag_keys) - set(versions):
+        cache.add(tag_key, time.time_ns(), None)
+        versions[tag_key] = cache.get(tag_key)
+    return versions
+
+
+def page_cache_key(request):
+    """Ключ страницы в кэше из пути и разрешённых параметров в
+    постоянном порядке."""
+    params = urlencode([
+        (param, request.GET[param]) for param in PAGE_CACHE_PARAMS
+        if param in request.GET
+    ])
+    return PAGE_CACHE_KEY.format(
+        hashlib.md5(f'{request.path}?{params}'.encode()).hexdigest()
+    )
+
+
+def punch_holes(content):
+    """Вырезает из страницы персональные фрагменты, оставляя метки."""
+    return HOLE_RE.sub(
+        lambda match: f'<!--hole:{match["template"]}--><!--/hole-->',
+        content,
+    )
+
+
+def fill_holes(content, request):
+    """Подставляет в метки фрагменты, отрисованные для запроса."""
+    return HOLE_RE.sub(
+        lambda match: (
+            f'<!--hole:{match["template"]}-->'
+            + render_to_string(match['template'], request=request)
+            + '<!--/hole-->'
+        ),
+        content,
+    )
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэширует страницы целиком для посетителей без сессии.
+
+    Попадание в кэш отдаётся до сессий, аутентификации и шаблонов:
+    заново рисуются только фрагменты, отмеченные тегом hole. Страницы
+    сбрасываются по ключам, которые проставила view через
+    add_surrogate_keys: попадание отдаётся, только если версии всех
+    её ключей не менялись. Подключается до SessionMiddleware.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None and self.is_fresh(cached):
+            request.user = AnonymousUser()
+            return self.cached_response(request, cached)
+        response = self.get_response(request)
+        if self.is_cacheable_response(request, response):
+            self.store(key, request, response)
+        return response
+
+    def is_cacheable_request(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and set(request.GET) <= set(PAGE_CACHE_PARAMS)
+        )
+
+    def is_cacheable_response(self, request, response):
+        return (
+            getattr(request, 'surrogate_keys', None)
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.user.is_authenticated
+        )
+
+    def is_fresh(self, cached):
+        versions = cached['versions']
+        return cache.get_many(list(versions)) == versions
+
+    def cached_response(self, request, cached):
+        """Отдаёт страницу из кэша или 304, если у клиента она уже
+        есть."""
+        headers = cached.get('headers', {})
+        response = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(
+                headers.get('Last-Modified', '')
+            ),
+        )
+        if response is None:
+            response = HttpResponse(
+                fill_holes(cached['content'], request),
+                content_type=cached['content_type'],
+            )
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def store(self, key, request, response):
+        cache.set(key, {
+            'content': punch_holes(response.content.decode(response.charset)),
+            'content_type': response['Content-Type'],
+            'headers': {
+                header: response[header] for header in CONDITIONAL_HEADERS
+                if response.has_header(header)
+            },
+            'versions': request.surrogate_key_versions,
+        }, settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ожидающее отправки фоновым отправщиком send_outbox."""
+    subject = models.CharField('Тема', max_length=998)
+    body = models.TextField('Текст')
+    html_body = models.TextField('HTML-версия', blank=True)
+    from_email = models.CharField('Отправитель', max_length=254)
+    recipients = models.TextField('Получатели')
+    headers = models.TextField('Заголовки', blank=True)
+    attachments = models.TextField('Вложения', blank=True)
+    created = models.DateTimeField('Дата постановки в очередь',
+                                   auto_now_add=True)
+    attempts = models.PositiveIntegerField('Попыток отправки', default=0)
+    next_attempt_at = models.DateTimeField('Следующая попытка')
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    claim_token = models.CharField(
+        'Метка отправщика',
+        max_length=32,
+        blank=True,
+        db_index=True,
+    )
+
+    class Meta:
+        ordering = ('next_attempt_at', 'pk')
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['sent_at', 'next_attempt_at'],
+                name='outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.subject
@@ -0,0 +1,30 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Файл из upload_to='posts/' сохраняется как
+    posts/ab/cd/abcd...ef.jpg: каталоги по первым байтам хэша не дают
+    одному каталогу разрастись, а одинаковые загрузки попадают в один
+    файл, поэтому удалять его можно, только когда на него не осталось
+    ссылок — их считает код, использующий хранилище.
+    """
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        name = os.path.join(
+            os.path.dirname(name), digest[:2], digest[2:4],
+            digest + extension,
+        )
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
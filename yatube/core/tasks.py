@@ -0,0 +1,96 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_process_executor = None
+
+
+def get_executor():
+    """Возвращает общий пул фоновых потоков, создавая его при первом
+    обращении.
+
+    Пул из одного потока выполняет задачи строго по очереди, поэтому
+    подписка и отписка от одного автора не обгоняют друг друга."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS_WORKERS,
+            thread_name_prefix='yatube-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась ошибкой', func)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Ставит func в очередь фонового пула после фиксации транзакции.
+
+    При TASKS_EAGER задача выполняется сразу в текущем потоке."""
+    if settings.TASKS_EAGER:
+        func(*args, **kwargs)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, func, args, kwargs)
+    )
+
+
+def get_process_executor():
+    """Возвращает общий пул процессов для тяжёлых задач вроде
+    обработки картинок, создавая его при первом обращении.
+
+    Процессы запускаются заново (spawn), а не копией текущего, и
+    настраивают Django сами: так им не достаются открытые соединения
+    с базой и потоки родителя."""
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(
+            max_workers=settings.TASKS_PROCESSES,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _process_executor
+
+
+def _done(future, func, callback):
+    try:
+        result = future.result()
+    except Exception:
+        logger.exception('Задача %s в пуле процессов завершилась ошибкой',
+                         func)
+        return
+    if callback is not None:
+        _run(callback, (result,), {})
+
+
+def run_in_process(func, *args, callback=None):
+    """Ставит func в очередь пула процессов после фиксации транзакции.
+
+    func и её аргументы должны передаваться между процессами. Результат
+    передаётся в callback, который выполняется в текущем процессе.
+    При TASKS_EAGER задача выполняется сразу в текущем потоке."""
+    if settings.TASKS_EAGER:
+        result = func(*args)
+        if callback is not None:
+            callback(result)
+        return
+
+    def submit():
+        future = get_process_executor().submit(func, *args)
+        future.add_done_callback(
+            lambda future: _done(future, func, callback)
+        )
+    transaction.on_commit(submit)
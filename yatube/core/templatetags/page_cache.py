@@ -0,0 +1,16 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name):
+    """Выводит шаблон, который кэш страниц рисует для каждого
+    запроса заново."""
+    content = context.template.engine.get_template(
+        template_name
+    ).render(context)
+    return mark_safe(
+        f'<!--hole:{template_name}-->{content}<!--/hole-->'
+    )
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class EagerTasksRunner(DiscoverRunner):
+    """Запускает тесты с фоновыми задачами, выполняемыми сразу: тесты
+    в TestCase не фиксируют транзакции, и задачи из on_commit до них
+    бы не дошли. Тесты самой очереди выключают это через
+    override_settings(TASKS_EAGER=False)."""
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TASKS_EAGER = True
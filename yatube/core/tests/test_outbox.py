@@ -0,0 +1,173 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from core.mail import claim_batch, retry_delay
+from core.models import OutboxMessage
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMessage, send_mail
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Бэкенд, который не может отправить ни одного письма."""
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    """Бэкенд locmem, считающий открытые соединения."""
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=3,
+    OUTBOX_RETRY_DELAY=60,
+    OUTBOX_RETRY_MAX_DELAY=100,
+)
+class TestOutbox(TestCase):
+    """Класс для проверки очереди исходящих писем."""
+    def queue(self, count=1):
+        for number in range(count):
+            send_mail(f'Тема {number}', 'Текст', 'from@example.com',
+                      ['to@example.com'])
+
+    def test_send_mail_only_queues(self):
+        """Проверяет, что send_mail кладёт письмо в очередь, а не
+        отправляет его."""
+        self.queue()
+        self.assertEqual(len(mail.outbox), 0, 'Письмо отправлено сразу')
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.subject, 'Тема 0')
+        self.assertEqual(
+            json.loads(message.recipients)['to'], ['to@example.com']
+        )
+
+    def test_wish_me_queues_message(self):
+        """Проверяет, что форма пожелания ставит письмо в очередь
+        и сразу перенаправляет на страницу благодарности."""
+        response = Client().post('/about/wish_me/', {
+            'name': 'Гость',
+            'email': 'guest@example.com',
+            'comment': 'Удачи',
+        })
+        self.assertRedirects(response, '/about/thank_you/')
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.from_email, 'guest@example.com')
+        self.assertIsNone(message.sent_at, 'Письмо отправлено сразу')
+
+    def test_password_reset_goes_through_outbox(self):
+        """Проверяет, что письмо сброса пароля попадает в очередь."""
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='pass'
+        )
+        Client().post(reverse('password_reset'),
+                      {'email': 'auth@example.com'})
+        self.assertEqual(OutboxMessage.objects.count(), 1,
+                         'Письмо сброса пароля не попало в очередь')
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='core.tests.test_outbox.CountingEmailBackend'
+    )
+    def test_send_outbox_uses_one_connection_per_batch(self):
+        """Проверяет, что send_outbox отправляет пачку через одно
+        соединение и помечает письма отправленными."""
+        self.queue(5)
+        CountingEmailBackend.opened = 0
+        call_command('send_outbox', batch_size=10, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingEmailBackend.opened, 1,
+                         'Соединение открывалось для каждого письма')
+        self.assertFalse(
+            OutboxMessage.objects.filter(sent_at__isnull=True).exists()
+        )
+
+    def test_send_outbox_drains_queue_in_batches(self):
+        """Проверяет, что очередь больше пачки отправляется целиком."""
+        self.queue(5)
+        call_command('send_outbox', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        call_command('send_outbox', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5, 'Письмо отправлено дважды')
+
+    @override_settings(
+        OUTBOX_EMAIL_BACKEND='core.tests.test_outbox.FailingEmailBackend'
+    )
+    def test_failed_message_is_retried_with_backoff(self):
+        """Проверяет, что неудачное письмо откладывается с растущей
+        задержкой и перестаёт отправляться после OUTBOX_MAX_ATTEMPTS."""
+        self.queue()
+        before = timezone.now()
+        call_command('send_outbox', stdout=StringIO())
+        message = OutboxMessage.objects.get()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('SMTP недоступен', message.last_error)
+        self.assertGreaterEqual(message.next_attempt_at,
+                                before + timedelta(seconds=60))
+        call_command('send_outbox', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1,
+                         'Письмо отправлено раньше назначенного времени')
+        for attempt in range(5):
+            OutboxMessage.objects.update(next_attempt_at=timezone.now())
+            call_command('send_outbox', stdout=StringIO())
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 3,
+                         'Письмо отправлялось больше OUTBOX_MAX_ATTEMPTS раз')
+        self.assertIsNone(message.sent_at)
+
+    def test_retry_delay_doubles_up_to_limit(self):
+        """Проверяет, что задержка удваивается и ограничена сверху."""
+        self.assertEqual(retry_delay(1), timedelta(seconds=60))
+        self.assertEqual(retry_delay(2), timedelta(seconds=100))
+        self.assertEqual(retry_delay(10), timedelta(seconds=100))
+
+    def test_claimed_messages_skipped_by_other_senders(self):
+        """Проверяет, что письма, забранные одним отправщиком, не
+        достаются другому, пока не истечёт срок."""
+        self.queue(3)
+        claimed = claim_batch(2)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(len({message.claim_token for message in claimed}),
+                         1)
+        other = claim_batch(10)
+        self.assertEqual(len(other), 1, 'Письмо забрано дважды')
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 0, 'Забранные письма отправлены')
+        OutboxMessage.objects.update(next_attempt_at=timezone.now())
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3,
+                         'Письма брошенного отправщика не вернулись')
+        self.assertFalse(OutboxMessage.objects.exclude(claim_token=''))
+
+    def test_headers_and_attachments_kept(self):
+        """Проверяет, что заголовки и вложения проходят через
+        очередь."""
+        message = EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            headers={'X-Yatube': 'outbox'},
+        )
+        message.attach('report.csv', 'a,b\n', 'text/csv')
+        message.attach('logo.png', b'\x89PNG', 'image/png')
+        message.send()
+        call_command('send_outbox', stdout=StringIO())
+        sent = mail.outbox[0]
+        self.assertEqual(sent.extra_headers, {'X-Yatube': 'outbox'})
+        self.assertEqual(sent.attachments, [
+            ('report.csv', 'a,b\n', 'text/csv'),
+            ('logo.png', b'\x89PNG', 'image/png'),
+        ])
@@ -0,0 +1,117 @@
+from unittest import mock
+
+from core.middleware import add_surrogate_keys, purge_surrogate_keys
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class TestAnonymousPageCache(TestCase):
+    """Класс для проверки кэша страниц для анонимных посетителей."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+            first_name='Тестовое имя',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_anonymous_page_served_from_cache(self):
+        """Проверяет, что повторный запрос гостя отдаётся из кэша
+        с заново отрисованной шапкой."""
+        adress = reverse('posts:group_list', args=[self.group.slug])
+        self.guest_client.get(adress)
+        response = self.guest_client.get(adress)
+        self.assertTemplateNotUsed(response, 'posts/group_list.html')
+        self.assertTemplateUsed(response, 'includes/header_user.html')
+        self.assertContains(response, 'Тестовый пост')
+        self.assertContains(response, 'Войти')
+
+    def test_authorized_user_bypasses_cache(self):
+        """Проверяет, что пользователь с сессией не получает
+        закэшированную страницу и не попадает в кэш."""
+        adress = reverse('posts:group_list', args=[self.group.slug])
+        self.guest_client.get(adress)
+        response = self.authorized_client.get(adress)
+        self.assertTemplateUsed(response, 'posts/group_list.html')
+        self.assertContains(response, 'Привет Тестовое имя')
+        response = self.guest_client.get(adress)
+        self.assertNotContains(response, 'Привет Тестовое имя')
+
+    def test_pages_purged_by_surrogate_keys(self):
+        """Проверяет, что изменения моделей сбрасывают помеченные
+        ими страницы."""
+        changes = {
+            reverse('posts:post_datail', args=[self.post.pk]): (
+                lambda: Comment.objects.create(
+                    post=self.post, author=self.user, text='Коммент')
+            ),
+            reverse('posts:group_list', args=[self.group.slug]): (
+                lambda: self.group.save()
+            ),
+            reverse('posts:profile', args=[self.user.username]): (
+                lambda: self.user.save()
+            ),
+            reverse('posts:index'): (
+                lambda: Post.objects.create(text='Новый', author=self.user)
+            ),
+        }
+        for adress, change in changes.items():
+            with self.subTest(adress=adress):
+                self.guest_client.get(adress)
+                change()
+                response = self.guest_client.get(adress)
+                self.assertTemplateUsed(
+                    response,
+                    'base.html',
+                    f'Страница {adress} не сброшена из кэша',
+                )
+
+    def test_only_known_params_cached(self):
+        """Проверяет, что ключ строится из разрешённых параметров, а
+        запросы с посторонними параметрами не кэшируются."""
+        adress = reverse('posts:index')
+        self.guest_client.get(adress, {'page': 1, 'q': 'a'})
+        response = self.guest_client.get(adress, {'q': 'a', 'page': 1})
+        self.assertTemplateNotUsed(response, 'base.html')
+        for _ in range(2):
+            response = self.guest_client.get(adress, {'utm': 'x'})
+            self.assertTemplateUsed(
+                response, 'base.html', 'Посторонний параметр закэширован'
+            )
+
+    def test_purge_during_render_not_cached(self):
+        """Проверяет, что страница, сброшенная во время отрисовки, не
+        отдаётся из кэша."""
+        adress = reverse('posts:group_list', args=[self.group.slug])
+        original = add_surrogate_keys
+
+        def purge_after_tagging(request, *keys):
+            original(request, *keys)
+            purge_surrogate_keys(*keys)
+
+        with mock.patch('posts.views.add_surrogate_keys',
+                        purge_after_tagging):
+            self.guest_client.get(adress)
+        response = self.guest_client.get(adress)
+        self.assertTemplateUsed(response, 'base.html')
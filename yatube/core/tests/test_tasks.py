@@ -0,0 +1,46 @@
+from core.tasks import get_executor, run_in_background
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+def wait_for_tasks():
+    """Ждёт, пока пул выполнит всё, что поставлено до этого: поток
+    в пуле один, задачи идут по очереди."""
+    get_executor().submit(lambda: None).result(timeout=30)
+
+
+@override_settings(TASKS_EAGER=False)
+class TestBackgroundTasks(TransactionTestCase):
+    """Класс для проверки очереди фоновых задач без TASKS_EAGER."""
+    def test_task_runs_after_commit(self):
+        """Проверяет, что задача уходит в пул только после фиксации
+        транзакции и не выполняется при её откате."""
+        calls = []
+        with transaction.atomic():
+            run_in_background(calls.append, 'commit')
+            self.assertEqual(calls, [], 'Задача выполнена до фиксации')
+        try:
+            with transaction.atomic():
+                run_in_background(calls.append, 'rollback')
+                raise ValueError
+        except ValueError:
+            pass
+        wait_for_tasks()
+        self.assertEqual(calls, ['commit'])
+
+    def test_fan_out_runs_in_background(self):
+        """Проверяет, что новый пост попадает в ленту подписчика через
+        фоновый пул."""
+        author = User.objects.create(username='author')
+        follower = User.objects.create(username='follower')
+        Follow.objects.create(user=follower, author=author)
+        wait_for_tasks()
+        post = Post.objects.create(text='Тестовый пост', author=author)
+        wait_for_tasks()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=follower, post=post
+        ).exists())
@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db.models.expressions import RawSQL
 
 from .models import Comment, Follow, Group, Post
+from .search import match_expression, matching_post_ids_sql
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,6 +14,17 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date', )
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет посты по полнотекстовому индексу вместо LIKE."""
+        if not search_term:
+            return queryset, False
+        expression = match_expression(search_term)
+        if not expression:
+            return queryset.none(), False
+        return queryset.filter(
+            pk__in=RawSQL(*matching_post_ids_sql(expression))
+        ), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Класс для удобной работы в админке. Изменяет вид отображения групп.
@@ -0,0 +1,68 @@
+from posts.models import Post
+
+# Поле ответа -> колонки, которые для него нужно выбрать из базы.
+FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'author': ('author__username',),
+    'group': ('group__slug',),
+    'image': ('image', 'image_width', 'image_height'),
+    'comment_count': ('comment_count',),
+}
+# Без этих колонок не построить курсор страницы.
+CURSOR_COLUMNS = ('id', 'pub_date')
+
+
+class InvalidFields(ValueError):
+    """В параметре fields есть неизвестные поля."""
+
+
+def parse_fields(value):
+    """Разбирает параметр fields. Пустые элементы пропускаются, а
+    параметр без полей означает все поля."""
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in (value or '').split(',') if field.strip()
+    ))
+    if not fields:
+        return tuple(FIELDS)
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise InvalidFields(', '.join(unknown))
+    return fields
+
+
+def post_queryset(fields):
+    """Посты, из которых выбираются только колонки нужных полей, а
+    автор и группа присоединяются, только если их запросили."""
+    columns = set(CURSOR_COLUMNS)
+    for field in fields:
+        columns.update(FIELDS[field])
+    related = [name for name in ('author', 'group') if name in fields]
+    return Post.objects.select_related(*related).only(*columns)
+
+
+def _image(post):
+    if not post.image:
+        return None
+    return {
+        'url': post.image.url,
+        'width': post.image_width,
+        'height': post.image_height,
+    }
+
+
+SERIALIZERS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': _image,
+    'comment_count': lambda post: post.comment_count,
+}
+
+
+def serialize_post(post, fields):
+    """Превращает пост в словарь только с полями fields."""
+    return {field: SERIALIZERS[field](post) for field in fields}
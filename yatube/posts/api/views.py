@@ -0,0 +1,112 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from posts.models import Group, User
+from posts.paginators import CursorPaginator
+
+from .serializers import (InvalidFields, parse_fields, post_queryset,
+                          serialize_post)
+
+# Наибольшее значение первичного ключа: id больше него база отвергает
+# с ошибкой вместо пустого результата.
+MAX_ID = 2 ** 63 - 1
+
+
+def error_response(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def etag_response(request, data):
+    """Отдаёт data в JSON с сильным ETag по содержимому ответа.
+
+    Если клиент прислал тот же ETag в If-None-Match, тело не
+    отправляется: ответ 304."""
+    content = json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode()
+    etag = '"{}"'.format(hashlib.sha256(content).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def feed_response(request, queryset_filter):
+    """Отдаёт страницу ленты по курсорам after/before только с полями
+    из параметра fields."""
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except InvalidFields as error:
+        return error_response(f'Неизвестные поля: {error}')
+    paginator = CursorPaginator(
+        queryset_filter(post_queryset(fields)), settings.PAGE_SIZE
+    )
+    page = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return etag_response(request, {
+        'results': [serialize_post(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@require_safe
+def index(request):
+    """Лента всех постов. С параметром ids возвращает посты с этими id
+    в том же порядке, пропуская несуществующие."""
+    if 'ids' in request.GET:
+        return batch(request)
+    return feed_response(request, lambda posts: posts)
+
+
+def batch(request):
+    """Посты по списку id из параметра ids."""
+    try:
+        ids = [int(pk) for pk in request.GET['ids'].split(',') if pk]
+    except ValueError:
+        ids = None
+    if ids is None or not all(0 < pk <= MAX_ID for pk in ids):
+        return error_response(
+            'Параметр ids — список положительных чисел через запятую, '
+            f'не больше {MAX_ID}'
+        )
+    if len(ids) > settings.API_MAX_IDS:
+        return error_response(
+            f'Можно запросить не больше {settings.API_MAX_IDS} постов'
+        )
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+    except InvalidFields as error:
+        return error_response(f'Неизвестные поля: {error}')
+    posts = post_queryset(fields).in_bulk(ids)
+    return etag_response(request, {
+        'results': [
+            serialize_post(posts[pk], fields) for pk in dict.fromkeys(ids)
+            if pk in posts
+        ],
+    })
+
+
+@require_safe
+def group_posts(request, slug):
+    """Лента постов группы."""
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return feed_response(request, lambda posts: posts.filter(group=group))
+
+
+@require_safe
+def profile(request, username):
+    """Лента постов автора."""
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return feed_response(request, lambda posts: posts.filter(author=author))
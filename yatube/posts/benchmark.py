@@ -0,0 +1,174 @@
+import json
+import math
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Group, Post, UserStats
+
+User = get_user_model()
+
+# Замер -> (имя адреса, кто открывает страницу).
+SCENARIOS = {
+    'index': ('posts:index', 'guest'),
+    'index_user': ('posts:index', 'reader'),
+    'group_posts': ('posts:group_list', 'guest'),
+    'profile': ('posts:profile', 'guest'),
+    'datail': ('posts:post_datail', 'guest'),
+    'follow_index': ('posts:follow_index', 'reader'),
+}
+METRICS = ('p50_ms', 'p90_ms', 'p99_ms', 'queries', 'peak_kb')
+# Метрика -> допустимый рост относительно базовой линии. None —
+# подставляется порог из параметра threshold. p99 на десятках
+# повторов почти совпадает с максимумом и слишком шумит для проверки.
+GATES = {
+    'p50_ms': None,
+    'p90_ms': None,
+    'queries': 0,
+    'peak_kb': None,
+}
+# Время и память зависят от машины, на которой снята базовая линия, и
+# их рост по умолчанию только предупреждение. Число запросов от машины
+# не зависит.
+MACHINE_METRICS = ('p50_ms', 'p90_ms', 'peak_kb')
+
+
+def percentile(values, rank):
+    """Процентиль rank по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def url_args(url_name):
+    """Подбирает самые тяжёлые страницы набора: самую большую группу,
+    самого популярного автора и самый обсуждаемый пост."""
+    if url_name == 'posts:group_list':
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total', 'pk').first()
+        return [group.slug]
+    if url_name == 'posts:profile':
+        stats = UserStats.objects.select_related('user').order_by(
+            '-posts_count', 'pk').first()
+        return [stats.user.username]
+    if url_name == 'posts:post_datail':
+        return [Post.objects.order_by('-comment_count', 'pk').values_list(
+            'pk', flat=True).first()]
+    return []
+
+
+def make_clients():
+    """Гость и читатель, подписанный на больше всего авторов."""
+    reader = UserStats.objects.order_by(
+        '-following_count', 'pk').values_list('user_id', flat=True).first()
+    clients = {'guest': Client(), 'reader': Client()}
+    clients['reader'].force_login(User.objects.get(pk=reader))
+    return clients
+
+
+def _request(client, url, cold):
+    if cold:
+        cache.clear()
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f'{url} ответил {response.status_code}')
+
+
+def measure(client, url, iterations, warmup, cold):
+    """Замеряет страницу: время ответа, число запросов к базе и пик
+    выделенной памяти. Каждая метрика снимается отдельным проходом,
+    чтобы подсчёт запросов и tracemalloc не искажали время."""
+    for _ in range(warmup):
+        _request(client, url, cold)
+    if cold:
+        cache.clear()
+    # Журнал запросов ограничен по длине: заполненный при генерации
+    # данных, он не дал бы посчитать новые запросы.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    # Следующий запрос очистит журнал, поэтому число читается сразу.
+    query_count = len(queries)
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        started = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    peaks = []
+    for _ in range(max(iterations // 10, 1)):
+        if cold:
+            cache.clear()
+        tracemalloc.start()
+        client.get(url)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p90_ms': round(percentile(timings, 90), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': query_count,
+        'peak_kb': round(percentile(peaks, 50) / 1024),
+    }
+
+
+def run(scenarios=None, iterations=50, warmup=5, cold=True):
+    """Прогоняет замеры через тестовый Client и возвращает метрики по
+    каждому сценарию. С cold кэш очищается перед каждым запросом, и
+    замер показывает стоимость самой view и шаблонов."""
+    clients = make_clients()
+    results = {}
+    for name in scenarios or SCENARIOS:
+        url_name, who = SCENARIOS[name]
+        url = reverse(url_name, args=url_args(url_name))
+        results[name] = measure(clients[who], url, iterations, warmup, cold)
+    return results
+
+
+def compare(results, baseline, threshold, strict=False):
+    """Сравнивает результаты с базовой линией: время и память могут
+    вырасти не больше чем на threshold, число запросов расти не должно.
+
+    Возвращает регрессии и предупреждения. Рост времени и памяти
+    попадает в регрессии только при strict, когда базовая линия снята
+    на этой же машине."""
+    regressions, warnings = [], []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, allowed in GATES.items():
+            if metric not in base:
+                continue
+            limit = base[metric] * (1 + (
+                threshold if allowed is None else allowed
+            ))
+            if metrics[metric] <= limit:
+                continue
+            found = (warnings if metric in MACHINE_METRICS and not strict
+                     else regressions)
+            found.append(
+                f'{name}.{metric}: {metrics[metric]} '
+                f'при базовом {base[metric]}'
+            )
+    return regressions, warnings
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as baseline:
+        return json.load(baseline)['results']
+
+
+def save_baseline(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as baseline:
+        json.dump({'meta': meta, 'results': results}, baseline,
+                  ensure_ascii=False, indent=2, sort_keys=True)
+        baseline.write('\n')
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, у которых каждый процесс видит только свой кэш.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Поколения страниц и лент живут в кэше. С кэшем в памяти процесса
+    другие рабочие процессы не видят их смены и до конца интервала
+    PAGE_VALIDATOR_TIMEOUT отвечают 304 на устаревшие копии."""
+    if settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS:
+        return [Warning(
+            'Кэш по умолчанию не общий для процессов.',
+            hint='Для нескольких рабочих процессов настройте memcached, '
+                 'Redis или кэш в базе данных.',
+            id='posts.W001',
+        )]
+    return []
@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+def recount_user(user_id):
+    """Пересчитывает счётчики пользователя и сохраняет их."""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=user_id).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=user_id).count(),
+            'following_count': Follow.objects.filter(
+                user_id=user_id).count(),
+        },
+    )
+    return stats
+
+
+def get_user_stats(user):
+    """Возвращает счётчики пользователя, создавая их при отсутствии."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_user(user.pk)
+
+
+def shift_user_counter(user_id, field, delta):
+    """Атомарно сдвигает счётчик пользователя на delta.
+
+    Если счётчиков ещё нет, при увеличении они считаются заново,
+    а уменьшение пропускается: пользователь может удаляться."""
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        recount_user(user_id)
+
+
+def shift_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def _chunks(queryset, chunk_size):
+    """Перебирает первичные ключи queryset пачками по chunk_size."""
+    last_pk = 0
+    while True:
+        pks = list(queryset.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last_pk = pks[-1]
+
+
+def _grouped_counts(queryset, field, pks):
+    return dict(queryset.filter(**{f'{field}__in': pks}).order_by().values(
+        field).annotate(total=Count('pk')).values_list(field, 'total'))
+
+
+def reconcile_posts(chunk_size):
+    """Пересчитывает comment_count постов пачками. Возвращает число
+    исправленных постов."""
+    fixed = 0
+    for pks in _chunks(Post.objects.all(), chunk_size):
+        counts = _grouped_counts(Comment.objects.all(), 'post', pks)
+        drifted = []
+        for post in Post.objects.filter(pk__in=pks).only('comment_count'):
+            actual = counts.get(post.pk, 0)
+            if post.comment_count != actual:
+                post.comment_count = actual
+                drifted.append(post)
+        Post.objects.bulk_update(drifted, ['comment_count'])
+        fixed += len(drifted)
+    return fixed
+
+
+def reconcile_users(chunk_size):
+    """Пересчитывает счётчики пользователей пачками. Возвращает число
+    исправленных пользователей."""
+    fields = ('posts_count', 'followers_count', 'following_count')
+    fixed = 0
+    for pks in _chunks(User.objects.all(), chunk_size):
+        counts = {
+            'posts_count': _grouped_counts(Post.objects.all(), 'author', pks),
+            'followers_count': _grouped_counts(
+                Follow.objects.all(), 'author', pks),
+            'following_count': _grouped_counts(
+                Follow.objects.all(), 'user', pks),
+        }
+        existing = UserStats.objects.in_bulk(pks)
+        missing, drifted = [], []
+        for pk in pks:
+            actual = {field: counts[field].get(pk, 0) for field in fields}
+            stats = existing.get(pk)
+            if stats is None:
+                missing.append(UserStats(user_id=pk, **actual))
+            elif any(getattr(stats, field) != actual[field]
+                     for field in fields):
+                for field, value in actual.items():
+                    setattr(stats, field, value)
+                drifted.append(stats)
+        UserStats.objects.bulk_create(missing)
+        UserStats.objects.bulk_update(drifted, fields)
+        fixed += len(missing) + len(drifted)
+    return fixed
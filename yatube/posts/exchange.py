@@ -0,0 +1,220 @@
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from . import images, search, timeline
+from .counters import reconcile_posts, reconcile_users
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Таблицы выгрузки в порядке, в котором их нужно загружать обратно:
+# имя файла -> (модель, поля). Пароли, почта и права пользователей
+# не выгружаются.
+TABLES = {
+    'users': (User, ('id', 'username', 'first_name', 'last_name',
+                     'date_joined', 'is_active')),
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (Post, ('id', 'text', 'pub_date', 'author_id', 'group_id',
+                     'image', 'image_width', 'image_height')),
+    'comments': (Comment, ('id', 'post_id', 'author_id', 'text',
+                           'created')),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Пишет даты с микросекундами: DjangoJSONEncoder обрезает их до
+    миллисекунд, и после загрузки посты с близкими датами могли бы
+    поменяться местами в лентах."""
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def table_path(directory, name):
+    return os.path.join(directory, f'{name}.ndjson.gz')
+
+
+def watermark_path(directory, name):
+    return table_path(directory, name) + '.watermark'
+
+
+def read_watermark(directory, name):
+    """Возвращает отметку выгрузки: последний выгруженный pk, число
+    строк и длину файла, на которой они закончились."""
+    try:
+        with open(watermark_path(directory, name)) as watermark:
+            return json.load(watermark)
+    except FileNotFoundError:
+        return {'pk': 0, 'rows': 0, 'offset': 0}
+
+
+def write_watermark(directory, name, watermark):
+    """Записывает отметку атомарно, чтобы обрыв не оставил её битой."""
+    path = watermark_path(directory, name)
+    with open(path + '.tmp', 'w') as temporary:
+        json.dump(watermark, temporary)
+    os.replace(path + '.tmp', path)
+
+
+def export_table(name, directory, chunk_size, resume=False):
+    """Выгружает таблицу name в сжатый gzip NDJSON по возрастанию pk.
+
+    Строки читаются итератором пачками по chunk_size, и каждая пачка
+    пишется отдельным членом gzip, поэтому память не растёт с размером
+    таблицы. После пачки сохраняется отметка: с resume выгрузка
+    обрезает недописанный хвост файла и продолжает со следующего pk.
+    Возвращает общее число выгруженных строк."""
+    model, fields = TABLES[name]
+    path = table_path(directory, name)
+    watermark = read_watermark(directory, name)
+    if not resume or not os.path.exists(path):
+        watermark = {'pk': 0, 'rows': 0, 'offset': 0}
+    rows = model.objects.filter(pk__gt=watermark['pk']).order_by(
+        'pk').values(*fields).iterator(chunk_size=chunk_size)
+    with open(path, 'r+b' if watermark['offset'] else 'wb') as raw:
+        raw.truncate(watermark['offset'])
+        raw.seek(watermark['offset'])
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            with gzip.GzipFile(fileobj=raw, mode='wb') as member:
+                for row in chunk:
+                    member.write(json.dumps(
+                        row, cls=ExportEncoder, ensure_ascii=False
+                    ).encode())
+                    member.write(b'\n')
+            raw.flush()
+            os.fsync(raw.fileno())
+            watermark = {
+                'pk': chunk[-1]['id'],
+                'rows': watermark['rows'] + len(chunk),
+                'offset': raw.tell(),
+            }
+            write_watermark(directory, name, watermark)
+    return watermark['rows']
+
+
+@contextmanager
+def snapshot():
+    """Транзакция, все чтения в которой видят один снимок базы.
+
+    В SQLite снимок держит сама транзакция чтения, а в PostgreSQL
+    для этого нужен уровень изоляции REPEATABLE READ: при READ
+    COMMITTED каждый запрос видел бы свои данные."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                )
+        yield
+
+
+def export_tables(names, directory, chunk_size, resume=False):
+    """Выгружает таблицы по очереди из одного снимка базы, чтобы в
+    выгрузке не оказалось комментариев и подписок на посты и
+    пользователей, которых в ней нет. Перебирает пары (таблица, число
+    строк).
+
+    С resume снимок общий только для дописанной части: уже выгруженные
+    строки взяты из прошлого запуска."""
+    with snapshot():
+        for name in names:
+            yield name, export_table(name, directory, chunk_size, resume)
+
+
+def read_table(path):
+    """Перебирает строки выгрузки по одной, не читая файл целиком."""
+    with gzip.open(path, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+@contextmanager
+def preserved_timestamps(model):
+    """Отключает auto_now_add у полей модели, чтобы bulk_create
+    сохранил даты из выгрузки, а не текущее время."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _build(model, row):
+    if model is User:
+        # У загруженных пользователей нет пароля: войти они смогут
+        # после сброса пароля.
+        row['password'] = make_password(None)
+    return model(**row)
+
+
+def _batch_size(model, objs, batch_size):
+    """Уменьшает batch_size до предела базы на число параметров
+    в одном запросе: Django 2.2 сам его не ограничивает."""
+    limit = connection.ops.bulk_batch_size(
+        model._meta.concrete_fields, objs
+    )
+    return max(min(batch_size, limit), 1)
+
+
+def import_table(name, path, batch_size, transaction_size,
+                 skip_existing=False):
+    """Загружает таблицу name из файла выгрузки через bulk_create.
+
+    Строки пишутся пачками по batch_size, по transaction_size строк
+    в транзакции, с сохранением id и дат. Сигналы моделей при этом не
+    срабатывают: счётчики, поиск, ленты и кэши пересобирает
+    rebuild_derived. После каждой транзакции отдаёт число загруженных
+    строк и скорость загрузки в строках в секунду."""
+    model, _ = TABLES[name]
+    rows = read_table(path)
+    loaded, started = 0, time.monotonic()
+    with preserved_timestamps(model):
+        while True:
+            chunk = [_build(model, row)
+                     for row in islice(rows, transaction_size)]
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    chunk,
+                    batch_size=_batch_size(model, chunk, batch_size),
+                    ignore_conflicts=skip_existing,
+                )
+            loaded += len(chunk)
+            yield loaded, loaded / max(time.monotonic() - started, 1e-9)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def rebuild_derived(chunk_size=1000):
+    """Пересобирает всё, что обычно поддерживают сигналы: счётчики,
+    поисковый индекс, ссылки на картинки, ленты подписок и кэш."""
+    cache.clear()
+    reconcile_posts(chunk_size)
+    reconcile_users(chunk_size)
+    search.rebuild_index()
+    images.recount_references(chunk_size)
+    timeline.rebuild()
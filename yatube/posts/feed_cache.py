@@ -0,0 +1,84 @@
+import math
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+FEED_GENERATION_KEY = 'feed_generation'
+PAGE_GENERATION_KEY = 'page_generation'
+PAGE_MODIFIED_KEY = 'page_modified'
+
+
+def _generation(key):
+    """Начальное значение берётся из времени, чтобы после вытеснения
+    счётчика новые значения не совпали со старыми."""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, int(time.time()), None)
+        generation = cache.get(key)
+    return generation
+
+
+def _bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time()), None)
+
+
+def feed_generation():
+    """Возвращает текущее поколение лент для ключей кэша фрагментов."""
+    return _generation(FEED_GENERATION_KEY)
+
+
+def bump_feed_generation():
+    """Сдвигает поколение, делая все закэшированные ленты устаревшими.
+
+    Вместе с лентами устаревают и страницы целиком."""
+    _bump_generation(FEED_GENERATION_KEY)
+    bump_page_generation()
+
+
+def page_generation():
+    """Возвращает текущее поколение страниц для ETag.
+
+    Оно меняется при любом изменении, видном на лентах, странице
+    поста или профиле, в том числе при подписке."""
+    return _generation(PAGE_GENERATION_KEY)
+
+
+def page_epoch():
+    """Номер текущего интервала в PAGE_VALIDATOR_TIMEOUT секунд.
+
+    Он входит в ETag и ограничивает снизу Last-Modified: если процесс
+    не увидел смену поколения (кэш не общий), сохранённая клиентом
+    копия всё равно перестанет совпадать с началом нового интервала."""
+    return int(time.time() // settings.PAGE_VALIDATOR_TIMEOUT)
+
+
+def page_modified():
+    """Возвращает время последней смены поколения страниц, округлённое
+    вверх до секунды, или None, пока эта секунда не прошла.
+
+    Last-Modified точен до секунды: изменение в ту же секунду, что и
+    отданная страница, иначе не изменило бы заголовок."""
+    now = time.time()
+    modified = cache.get(PAGE_MODIFIED_KEY)
+    if modified is None:
+        modified = math.floor(now)
+        cache.add(PAGE_MODIFIED_KEY, modified, None)
+    modified = max(
+        math.ceil(modified),
+        page_epoch() * settings.PAGE_VALIDATOR_TIMEOUT,
+    )
+    if modified > now:
+        return None
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+
+def bump_page_generation():
+    """Сдвигает поколение страниц: сохранённые клиентами копии
+    перестают совпадать по ETag и Last-Modified."""
+    _bump_generation(PAGE_GENERATION_KEY)
+    cache.set(PAGE_MODIFIED_KEY, time.time(), None)
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm, ValidationError
 
+from .images import normalize_image
 from .models import Comment, Post
 
 
@@ -16,6 +18,18 @@ class PostForm(ModelForm):
             raise ValidationError('Поле должно быть заполенно')
         return data
 
+    def clean_image(self):
+        """Нормализует новую картинку: проверяет размер, поворачивает
+        по EXIF, убирает метаданные и уменьшает. Итоговый размер
+        сохраняется в посте."""
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image, size = normalize_image(image)
+            self.instance.image_width, self.instance.image_height = size
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+        return image
+
 
 class CommentForm(ModelForm):
     """Форма для создания комментария."""
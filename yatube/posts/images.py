@@ -0,0 +1,426 @@
+import os
+from io import BytesIO
+
+from core.middleware import purge_surrogate_keys
+from core.tasks import run_in_process
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import Count, F
+from PIL import Image, ImageOps
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.base import EXTENSIONS, ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .feed_cache import bump_feed_generation
+from .models import Post, StoredImage
+
+# Производные картинки поста: размер самой крупной, ширины для srcset,
+# атрибут sizes и опции sorl.
+DERIVATIVES = {
+    'card': {
+        'size': (960, 339),
+        'widths': (480, 960),
+        'sizes': '(max-width: 960px) 100vw, 960px',
+        'options': {'crop': 'center', 'upscale': True},
+    },
+}
+
+# Форматы по убыванию предпочтения. JPEG понимают все клиенты, поэтому
+# он создаётся всегда и отдаётся, когда остальные не подходят.
+FALLBACK_FORMAT = 'JPEG'
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+FORMAT_EXTENSIONS = {**EXTENSIONS, 'AVIF': 'avif'}
+# Форматы загрузок, которые показываются браузерами как есть. Остальные,
+# которые Pillow умеет лишь читать, перекодируются в PNG.
+UPLOAD_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+UPLOAD_FALLBACK_FORMAT = 'PNG'
+PNG_MODES = ('1', 'L', 'LA', 'I', 'P', 'RGB', 'RGBA')
+
+
+def supported_formats():
+    """Форматы из MIME_TYPES, которые умеет записывать установленный
+    Pillow: WebP и AVIF зависят от того, как он собран."""
+    Image.init()
+    return tuple(
+        image_format for image_format in MIME_TYPES
+        if image_format in Image.SAVE
+    )
+
+
+FORMATS = supported_formats()
+
+
+def derivative_geometry(kind, width):
+    full_width, full_height = DERIVATIVES[kind]['size']
+    return f'{width}x{round(width * full_height / full_width)}'
+
+
+class DerivativeBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет искать готовую миниатюру в kvstore,
+    не открывая исходный файл и не создавая миниатюру, и пишет AVIF."""
+    def get_options(self, source, options):
+        """Дополняет опции так же, как ThumbnailBackend.get_thumbnail,
+        чтобы имя миниатюры совпало с созданной."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Возвращает файл миниатюры, не проверяя, создана ли она."""
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.get_options(source, options)
+        )
+        return ImageFile(name, default.storage)
+
+    def lookup(self, file_, geometry_string, **options):
+        """Возвращает готовую миниатюру или None."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        key = tokey(source.key, geometry_string, serialize(options))
+        path = f'{key[:2]}/{key[2:4]}/{key}'
+        extension = FORMAT_EXTENSIONS[options['format']]
+        return f'{thumbnail_settings.THUMBNAIL_PREFIX}{path}.{extension}'
+
+
+backend = DerivativeBackend()
+
+
+def render_derivatives(name):
+    """Создаёт все производные картинки name во всех ширинах и
+    форматах. Выполняется в пуле процессов."""
+    for kind, spec in DERIVATIVES.items():
+        for width in spec['widths']:
+            for image_format in FORMATS:
+                backend.get_thumbnail(
+                    name, derivative_geometry(kind, width),
+                    format=image_format, **spec['options'],
+                )
+    return name
+
+
+def derivatives_ready(post_id, name):
+    """Сбрасывает закэшированные страницы, где у поста была заглушка.
+
+    Из кэша kvstore удаляются и записи о производных: промах там
+    запоминается, и без этого процесс, отрисовавший заглушку, не увидел
+    бы миниатюры, созданные в другом процессе."""
+    default.kvstore.cache.delete_many([
+        kvstore_key(thumbnail)
+        for thumbnail in derivative_files(name).values()
+    ])
+    bump_feed_generation()
+    purge_surrogate_keys(f'post:{post_id}')
+
+
+def schedule_derivatives(post):
+    """Ставит создание производных картинки поста в пул процессов."""
+    post_id = post.pk
+    run_in_process(
+        render_derivatives,
+        post.image.name,
+        callback=lambda name: derivatives_ready(post_id, name),
+    )
+
+
+def derivative_file(name, kind, width=None, image_format=FALLBACK_FORMAT):
+    """Возвращает файл производной картинки name, не проверяя, создана
+    ли она. По умолчанию — самой крупной в формате JPEG."""
+    spec = DERIVATIVES[kind]
+    if width is None:
+        width = max(spec['widths'])
+    return backend.thumbnail_file(
+        name, derivative_geometry(kind, width),
+        format=image_format, **spec['options'],
+    )
+
+
+def derivative_files(name):
+    """Возвращает файлы всех производных картинки name по ключу
+    (вид, ширина, формат)."""
+    return {
+        (kind, width, image_format): derivative_file(
+            name, kind, width, image_format
+        )
+        for kind, spec in DERIVATIVES.items()
+        for width in spec['widths']
+        for image_format in FORMATS
+    }
+
+
+def get_derivative(image, kind, width=None, image_format=FALLBACK_FORMAT):
+    """Возвращает готовую производную картинки или None, если она ещё
+    не создана. По умолчанию — самую крупную в формате JPEG."""
+    if not image:
+        return None
+    return default.kvstore.get(
+        derivative_file(image.name, kind, width, image_format)
+    )
+
+
+def derivative_size(post, kind):
+    """Возвращает размер производной картинки поста, не открывая
+    файлов: с обрезкой он задан видом, без неё — вычисляется из
+    сохранённого размера исходника."""
+    spec = DERIVATIVES[kind]
+    width, height = spec['size']
+    if spec['options'].get('crop') or not post.image_width:
+        return width, height
+    scale = min(width / post.image_width, height / post.image_height)
+    if not spec['options'].get('upscale'):
+        scale = min(scale, 1)
+    return (
+        round(post.image_width * scale), round(post.image_height * scale)
+    )
+
+
+def read_image_size(image):
+    """Читает размер картинки из заголовка файла или возвращает None,
+    если файл не открывается."""
+    try:
+        with image.storage.open(image.name) as image_file:
+            return Image.open(image_file).size
+    except (OSError, SuspiciousFileOperation):
+        return None
+
+
+def kvstore_key(image_file):
+    return add_prefix(image_file.key, 'image')
+
+
+def prefetch_derivatives(request, posts, kind='card'):
+    """Ищет производные картинок всех постов страницы одним обращением
+    к кэшу kvstore и одним запросом к базе для промахов.
+
+    Результат кладётся в request.derivatives, откуда его читает тег
+    derivative, по ключу (имя картинки, вид)."""
+    files = {
+        post.image.name: derivative_file(post.image.name, kind)
+        for post in posts if post.image
+    }
+    keys = {kvstore_key(thumbnail): name for name, thumbnail in files.items()}
+    kv_cache = default.kvstore.cache
+    values = kv_cache.get_many(list(keys))
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        kv_cache.set_many(
+            {key: found.get(key, EMPTY_VALUE) for key in missing},
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(found)
+    derivatives = getattr(request, 'derivatives', {})
+    for key, name in keys.items():
+        value = values.get(key)
+        derivatives[name, kind] = (
+            deserialize_image_file(value)
+            if value is not None and value != EMPTY_VALUE else None
+        )
+    request.derivatives = derivatives
+
+
+def has_derivatives(image):
+    """Проверяет, что все производные картинки уже созданы."""
+    return all(
+        default.kvstore.get(thumbnail)
+        for thumbnail in derivative_files(image.name).values()
+    )
+
+
+def accepted_formats(accept):
+    """Возвращает поддерживаемые форматы, которые клиент принимает
+    по заголовку Accept, по убыванию предпочтения сервера.
+
+    WebP и AVIF отдаются, только если клиент назвал их явно; JPEG
+    отдаётся всегда."""
+    accepted = set()
+    for item in accept.split(','):
+        media_type, *params = (part.strip() for part in item.split(';'))
+        quality = next(
+            (param[2:] for param in params if param.startswith('q=')), '1'
+        )
+        try:
+            if float(quality) > 0:
+                accepted.add(media_type.lower())
+        except ValueError:
+            continue
+    return [
+        image_format for image_format in FORMATS
+        if image_format == FALLBACK_FORMAT
+        or MIME_TYPES[image_format] in accepted
+    ]
+
+
+def normalize_image(uploaded):
+    """Приводит загруженную картинку к безопасному виду.
+
+    Размер проверяется по заголовку до чтения пикселей, поэтому
+    картинка-бомба отклоняется, не занимая память. Остальные
+    поворачиваются по EXIF, теряют метаданные и уменьшаются до
+    IMAGE_MAX_EDGE по длинной стороне. Анимации не перекодируются и
+    принимаются, только если уже укладываются в этот размер. Форматы
+    не из UPLOAD_FORMATS перекодируются в PNG.
+
+    Возвращает файл и его итоговый размер (ширина, высота)."""
+    uploaded.seek(0)
+    try:
+        image = Image.open(uploaded)
+    except (Image.DecompressionBombError, OSError):
+        raise ValidationError('Не удалось прочитать картинку')
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: не больше '
+            f'{settings.IMAGE_MAX_PIXELS // 1000000} мегапикселей'
+        )
+    max_edge = settings.IMAGE_MAX_EDGE
+    name = os.path.basename(uploaded.name)
+    content_type = uploaded.content_type
+    if (getattr(image, 'is_animated', False)
+            and image.format in UPLOAD_FORMATS):
+        if max(width, height) > max_edge:
+            raise ValidationError(
+                f'Анимация должна быть не больше {max_edge} пикселей '
+                'по длинной стороне'
+            )
+        uploaded.seek(0)
+        return uploaded, (width, height)
+    # Снимки телефонов бывают в MPO — это JPEG с дополнительными кадрами.
+    image_format = 'JPEG' if image.format == 'MPO' else image.format
+    if image_format not in UPLOAD_FORMATS:
+        image_format = UPLOAD_FALLBACK_FORMAT
+        name = f'{os.path.splitext(name)[0]}.png'
+        content_type = 'image/png'
+    icc_profile = image.info.get('icc_profile')
+    image.draft('RGB', (max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_edge, max_edge))
+    # Писатели PNG и WebP берут EXIF и текстовые поля из info, поэтому
+    # из неё остаётся только то, что нужно для отрисовки пикселей.
+    image.info = {
+        key: image.info[key] for key in ('transparency',)
+        if key in image.info
+    }
+    return SimpleUploadedFile(
+        name, _encode(image, image_format, icc_profile),
+        content_type=content_type,
+    ), image.size
+
+
+def _encode(image, image_format, icc_profile):
+    params = {}
+    if icc_profile:
+        params['icc_profile'] = icc_profile
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+        params.update(quality=settings.IMAGE_JPEG_QUALITY, optimize=True)
+    elif image_format == 'PNG' and image.mode not in PNG_MODES:
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    try:
+        image.save(buffer, format=image_format, **params)
+    except (KeyError, OSError, ValueError):
+        raise ValidationError('Не удалось сохранить картинку')
+    return buffer.getvalue()
+
+
+def retain(name):
+    """Отмечает, что на файл name сослался ещё один пост."""
+    if not name:
+        return
+    # Строку без ссылок может удалить _delete_image между созданием и
+    # увеличением счётчика: тогда она создаётся заново.
+    while not StoredImage.objects.filter(name=name).update(
+        references=F('references') + 1
+    ):
+        StoredImage.objects.get_or_create(name=name)
+
+
+def release(name):
+    """Снимает ссылку поста на файл name. Файл без ссылок удаляется
+    вместе с миниатюрами после фиксации транзакции."""
+    if not name:
+        return
+    StoredImage.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1
+    )
+    if StoredImage.objects.filter(name=name, references__lte=0).exists():
+        transaction.on_commit(lambda: _delete_image(name))
+
+
+def recount_references(chunk_size=1000):
+    """Пересчитывает ссылки постов на файлы картинок, например после
+    загрузки постов в обход сигналов."""
+    references = Post.objects.exclude(image='').values('image').annotate(
+        total=Count('pk')
+    ).order_by('image').values_list('image', 'total')
+    StoredImage.objects.exclude(
+        name__in=Post.objects.exclude(image='').values('image')
+    ).update(references=0)
+    chunk = []
+    for row in references.iterator():
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _save_references(dict(chunk))
+            chunk = []
+    _save_references(dict(chunk))
+
+
+def _save_references(counts):
+    existing = StoredImage.objects.in_bulk(list(counts), field_name='name')
+    for name, stored in existing.items():
+        stored.references = counts[name]
+    StoredImage.objects.bulk_update(existing.values(), ['references'])
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, references=total)
+        for name, total in counts.items() if name not in existing
+    )
+
+
+def _delete_image(name):
+    # Пока удаление ждало фиксации, ту же картинку могли загрузить
+    # заново: хранилище отдаёт новому посту существующий файл. Поэтому
+    # под блокировкой строки ещё раз проверяется, что ссылок нет.
+    with transaction.atomic():
+        stored = StoredImage.objects.select_for_update().filter(
+            name=name
+        ).first()
+        if (stored is None or stored.references > 0
+                or Post.objects.filter(image=name).exists()):
+            return
+        stored.delete()
+        # Миниатюры sorl привязаны к имени в хранилище по умолчанию,
+        # как их создаёт render_derivatives.
+        try:
+            delete_thumbnails(name)
+        except SuspiciousFileOperation:
+            # Путь вне MEDIA_ROOT записан в пост вручную, файл не наш.
+            pass
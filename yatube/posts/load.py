@@ -0,0 +1,280 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import WSGIRequestHandler, WSGIServer
+from django.db import connections
+from django.urls import Resolver404, resolve, reverse
+
+from .benchmark import percentile
+from .models import Group, Post
+
+User = get_user_model()
+
+# Действия виртуальных клиентов и их доля в смеси по умолчанию.
+DEFAULT_MIX = {
+    'browse': 70,
+    'follow': 15,
+    'comment': 10,
+    'post': 5,
+}
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Обработчик запросов, не печатающий строку на каждый запрос."""
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с фиксированным числом рабочих потоков.
+
+    Как у синхронных воркеров боевого сервера, одновременно
+    обрабатывается не больше workers запросов, остальные ждут
+    в очереди."""
+    def __init__(self, *args, workers, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='yatube-worker'
+        )
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            connections.close_all()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def start_server(application, workers, host='127.0.0.1', port=0):
+    """Запускает application в фоновом потоке и возвращает сервер.
+    Адрес — server.server_address."""
+    server = PooledWSGIServer(
+        (host, port), QuietRequestHandler, workers=workers
+    )
+    server.set_app(application)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url_name(url):
+    """Имя адреса вида posts:index, по которому группируются замеры."""
+    try:
+        return resolve(urlsplit(url).path).view_name
+    except Resolver404:
+        return urlsplit(url).path
+
+
+def is_expected(response, status, location=None):
+    """Проверяет код ответа, а у перенаправления — его адрес. Без
+    status подходит любой код меньше 400."""
+    if status is None:
+        if response.status_code >= 400:
+            return False
+    elif response.status_code != status:
+        return False
+    if not response.is_redirect:
+        return True
+    target = urlsplit(response.headers['Location']).path
+    if location is None:
+        return target != reverse(settings.LOGIN_URL)
+    return target == location
+
+
+class Recorder:
+    """Собирает задержки и ошибки запросов из всех потоков клиентов."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, latency, ok):
+        with self.lock:
+            self.latencies[name].append(latency)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, duration):
+        """Возвращает общую пропускную способность и процентили задержки
+        по каждому имени адреса."""
+        total = sum(len(values) for values in self.latencies.values())
+        rows = {}
+        for name, values in sorted(self.latencies.items()):
+            rows[name] = {
+                'requests': len(values),
+                'errors': self.errors[name],
+                'p50_ms': round(percentile(values, 50), 1),
+                'p95_ms': round(percentile(values, 95), 1),
+                'p99_ms': round(percentile(values, 99), 1),
+            }
+        return {
+            'requests': total,
+            'throughput': round(total / duration, 1) if duration else 0,
+            'urls': rows,
+        }
+
+
+class Dataset:
+    """Адреса, по которым ходят клиенты: выборка постов, групп и
+    авторов из базы, заполненной seed_yatube."""
+    SAMPLE = 1000
+
+    def __init__(self, username_prefix):
+        self.usernames = list(User.objects.filter(
+            username__startswith=username_prefix
+        ).order_by('pk').values_list('username', flat=True)[:self.SAMPLE])
+        self.post_ids = list(Post.objects.order_by(
+            '-pk').values_list('pk', flat=True)[:self.SAMPLE])
+        self.group_slugs = list(Group.objects.values_list('slug', flat=True))
+        self.group_ids = list(Group.objects.values_list('pk', flat=True))
+        if not self.usernames or not self.post_ids:
+            raise ValueError('В базе нет данных: запустите seed_yatube')
+
+
+class VirtualClient:
+    """Клиент, выполняющий действия из смеси: гостевой просмотр лент и
+    постов, лента подписок, комментарии и новые посты."""
+    def __init__(self, base_url, dataset, recorder, rng, username,
+                 password):
+        self.base_url = base_url
+        self.dataset = dataset
+        self.recorder = recorder
+        self.rng = rng
+        self.guest = requests.Session()
+        self.user = requests.Session()
+        self.username = username
+        self.password = password
+
+    def request(self, session, method, path, status=200, location=None,
+                **kwargs):
+        """Выполняет запрос и записывает его задержку. Успехом считается
+        только ответ с ожидаемым кодом status; для перенаправления —
+        ещё и на адрес location, а если он не задан — на любой адрес,
+        кроме страницы входа."""
+        url = self.base_url + path
+        # Соединение закрывается после ответа: иначе клиент занимал бы
+        # рабочий поток сервера между запросами. Сервер не повторяет
+        # Connection: close в ответе, поэтому соединение убирается и из
+        # пула клиента, чтобы не отправить следующий запрос в закрытое.
+        headers = {'Connection': 'close', 'Referer': url}
+        started = time.perf_counter()
+        try:
+            response = session.request(
+                method, url, headers=headers, allow_redirects=False,
+                timeout=60, **kwargs,
+            )
+            ok = is_expected(response, status, location)
+        except requests.RequestException:
+            response, ok = None, False
+        finally:
+            session.close()
+        self.recorder.record(
+            url_name(url), (time.perf_counter() - started) * 1000, ok
+        )
+        return response
+
+    def post_form(self, path, data, location=None, status=302):
+        """Отправляет форму; успешная форма перенаправляет на
+        location."""
+        data['csrfmiddlewaretoken'] = self.user.cookies.get('csrftoken', '')
+        return self.request(self.user, 'POST', path, status=status,
+                            location=location, data=data)
+
+    def login(self):
+        # Неудачный вход снова показывает форму с кодом 200.
+        self.request(self.user, 'GET', reverse('users:login'))
+        self.post_form(reverse('users:login'), {
+            'username': self.username,
+            'password': self.password,
+        }, location=reverse(settings.LOGIN_REDIRECT_URL))
+
+    def browse(self):
+        choice = self.rng.randrange(4)
+        if choice == 0:
+            path = reverse('posts:index')
+            if self.rng.random() < 0.3:
+                path += f'?page={self.rng.randint(2, 5)}'
+        elif choice == 1 and self.dataset.group_slugs:
+            path = reverse('posts:group_list',
+                           args=[self.rng.choice(self.dataset.group_slugs)])
+        elif choice == 2:
+            path = reverse('posts:profile',
+                           args=[self.rng.choice(self.dataset.usernames)])
+        else:
+            path = reverse('posts:post_datail',
+                           args=[self.rng.choice(self.dataset.post_ids)])
+        self.request(self.guest, 'GET', path)
+
+    def follow(self):
+        self.request(self.user, 'GET', reverse('posts:follow_index'))
+
+    def comment(self):
+        post_id = self.rng.choice(self.dataset.post_ids)
+        self.post_form(reverse('posts:add_comment', args=[post_id]), {
+            'text': f'Нагрузочный комментарий {self.rng.random()}',
+        }, location=reverse('posts:post_datail', args=[post_id]))
+
+    def post(self):
+        data = {'text': f'Нагрузочный пост {self.rng.random()}'}
+        if self.dataset.group_ids:
+            data['group'] = self.rng.choice(self.dataset.group_ids)
+        self.post_form(reverse('posts:post_create'), data,
+                       location=reverse('posts:profile',
+                                        args=[self.username]))
+
+    def run(self, mix, deadline):
+        """Выполняет случайные действия из mix до наступления
+        deadline."""
+        self.login()
+        actions, weights = zip(*mix.items())
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+
+
+def parse_mix(value):
+    """Разбирает смесь вида browse=70,follow=15 в словарь весов."""
+    mix = {}
+    for part in value.split(','):
+        action, _, weight = part.partition('=')
+        if action not in DEFAULT_MIX:
+            raise ValueError(f'Неизвестное действие: {action}')
+        mix[action] = float(weight)
+    return mix
+
+
+def drive(base_url, clients, duration, mix, seed=0,
+          username_prefix='seed_user_', password='yatube-seed'):
+    """Запускает clients параллельных клиентов на duration секунд и
+    возвращает отчёт Recorder.report."""
+    dataset = Dataset(username_prefix)
+    recorder = Recorder()
+    master = random.Random(seed)
+    virtual_clients = [
+        VirtualClient(
+            base_url, dataset, recorder, random.Random(master.random()),
+            master.choice(dataset.usernames), password,
+        )
+        for _ in range(clients)
+    ]
+    started = time.monotonic()
+    deadline = started + duration
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client.run, mix, deadline)
+                       for client in virtual_clients]:
+            future.result()
+    return recorder.report(time.monotonic() - started)
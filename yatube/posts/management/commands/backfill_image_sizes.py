@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from posts.images import read_image_size
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Записывает размеры картинок постов, у которых они ещё не '
+            'сохранены. Читается только заголовок файла.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько постов сохранять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_width__isnull=True
+        ).only('pk', 'image')
+        chunk, updated, missing = [], 0, 0
+        for post in posts.iterator():
+            size = read_image_size(post.image)
+            if size is None:
+                missing += 1
+                continue
+            post.image_width, post.image_height = size
+            chunk.append(post)
+            if len(chunk) >= options['chunk_size']:
+                Post.objects.bulk_update(
+                    chunk, ['image_width', 'image_height']
+                )
+                updated += len(chunk)
+                chunk = []
+        Post.objects.bulk_update(chunk, ['image_width', 'image_height'])
+        updated += len(chunk)
+        self.stdout.write(
+            f'Сохранены размеры картинок: {updated}, '
+            f'не удалось прочитать: {missing}'
+        )
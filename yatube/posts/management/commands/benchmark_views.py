@@ -0,0 +1,145 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from posts import benchmark
+from posts.seed import seed
+
+BASELINE = os.path.join(
+    os.path.dirname(benchmark.__file__), 'benchmarks', 'baseline.json'
+)
+# Масштаб набора, на котором снята базовая линия.
+SCALE = {
+    'users': 300,
+    'groups': 10,
+    'posts': 3000,
+    'comments': 9000,
+    'follows': 6000,
+}
+
+
+class Command(BaseCommand):
+    help = ('Замеряет страницы лент и поста через тестовый Client на '
+            'сгенерированной базе: процентили времени, число запросов и '
+            'пик памяти. Сравнивает с базовой линией: рост числа запросов '
+            'считается регрессией, а рост времени и памяти — '
+            'предупреждением, потому что они зависят от машины.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios',
+            default=','.join(benchmark.SCENARIOS),
+            help='Замеры через запятую: '
+                 + ', '.join(benchmark.SCENARIOS) + '.',
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--warm',
+            action='store_true',
+            help='Не очищать кэш перед запросами.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--current-db',
+            action='store_true',
+            help='Замерять на текущей базе, а не на временной тестовой, '
+                 'заполненной seed_yatube. Сравнение с базовой линией '
+                 'тогда имеет смысл только для того же набора данных.',
+        )
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Допустимый рост времени и памяти, доля от базовой линии.',
+        )
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Считать регрессией и рост времени и памяти, а не только '
+                 'числа запросов. Имеет смысл, только если базовая линия '
+                 'снята на этой же машине.',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать результаты как новую базовую линию.',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [name for name in options['scenarios'].split(',')
+                     if name]
+        unknown = set(scenarios) - set(benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(
+                'Неизвестные замеры: ' + ', '.join(sorted(unknown))
+            )
+        if options['current_db']:
+            results = self.measure(scenarios, options)
+        else:
+            results = self.measure_on_seeded_db(scenarios, options)
+        self.report(results)
+        if options['save_baseline']:
+            benchmark.save_baseline(options['baseline'], results, {
+                'scale': SCALE,
+                'seed': options['seed'],
+                'iterations': options['iterations'],
+                'cold': not options['warm'],
+            })
+            self.stdout.write(f'Базовая линия записана: '
+                              f'{options["baseline"]}')
+            return
+        self.check_baseline(results, options)
+
+    def measure(self, scenarios, options):
+        return benchmark.run(
+            scenarios,
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            cold=not options['warm'],
+        )
+
+    def measure_on_seeded_db(self, scenarios, options):
+        """Замеряет на временной тестовой базе с набором seed_yatube."""
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            seed(**SCALE, seed=options['seed'])
+            return self.measure(scenarios, options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, results):
+        columns = benchmark.METRICS
+        self.stdout.write(
+            f'{"замер":<14}' + ''.join(f'{c:>10}' for c in columns)
+        )
+        for name, metrics in results.items():
+            self.stdout.write(f'{name:<14}' + ''.join(
+                f'{metrics[column]:>10}' for column in columns
+            ))
+
+    def check_baseline(self, results, options):
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('Базовой линии нет, сравнение пропущено.')
+            return
+        regressions, warnings = benchmark.compare(
+            results,
+            benchmark.load_baseline(options['baseline']),
+            options['threshold'],
+            options['strict'],
+        )
+        if warnings:
+            self.stdout.write(
+                'Время или память выросли относительно базовой линии, '
+                'снятой, возможно, на другой машине:\n' + '\n'.join(warnings)
+            )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базовой линии:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write('Регрессий нет.')
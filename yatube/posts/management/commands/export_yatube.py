@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from posts.exchange import TABLES, export_table, export_tables
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, группы, посты, комментарии и '
+            'подписки в сжатые файлы NDJSON, по файлу на таблицу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory',
+            help='Каталог, в который пишутся файлы выгрузки.',
+        )
+        parser.add_argument(
+            '--tables',
+            default=','.join(TABLES),
+            help='Таблицы через запятую. По умолчанию все: '
+                 + ', '.join(TABLES) + '.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк читать из базы и сжимать за раз.',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить прерванную выгрузку с сохранённой отметки pk.',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Сколько таблиц выгружать параллельно. По умолчанию '
+                 'таблицы читаются по очереди из одного снимка базы. '
+                 'Параллельные потоки читают каждый в своей транзакции, '
+                 'и выгрузка согласована, только если запись в базу '
+                 'остановлена.',
+        )
+
+    def handle(self, *args, **options):
+        tables = [name for name in options['tables'].split(',') if name]
+        unknown = set(tables) - set(TABLES)
+        if unknown:
+            raise CommandError(
+                'Неизвестные таблицы: ' + ', '.join(sorted(unknown))
+            )
+        os.makedirs(options['directory'], exist_ok=True)
+        if options['jobs'] == 1:
+            for name, rows in export_tables(
+                    tables, options['directory'], options['chunk_size'],
+                    options['resume']):
+                self.stdout.write(f'{name}: {rows} строк')
+            return
+        with ThreadPoolExecutor(max_workers=options['jobs']) as executor:
+            futures = {
+                name: executor.submit(
+                    self.export, name, options['directory'],
+                    options['chunk_size'], options['resume'],
+                )
+                for name in tables
+            }
+            for name, future in futures.items():
+                self.stdout.write(f'{name}: {future.result()} строк')
+
+    def export(self, *args):
+        """Выгружает таблицу в потоке пула со своим соединением с базой
+        и закрывает его по окончании."""
+        try:
+            return export_table(*args)
+        finally:
+            connections.close_all()
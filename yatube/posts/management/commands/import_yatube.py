@@ -0,0 +1,70 @@
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from posts.exchange import TABLES, import_table, rebuild_derived, table_path
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_yatube пачками через bulk_create, '
+            'а затем пересобирает счётчики, поиск, ленты и кэш.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'directory',
+            help='Каталог с файлами выгрузки.',
+        )
+        parser.add_argument(
+            '--tables',
+            default=','.join(TABLES),
+            help='Таблицы через запятую. Загружаются в порядке '
+                 + ', '.join(TABLES) + '; отсутствующие файлы пропускаются.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк вставлять одним запросом.',
+        )
+        parser.add_argument(
+            '--transaction-size',
+            type=int,
+            default=20000,
+            help='Сколько строк загружать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--skip-existing',
+            action='store_true',
+            help='Пропускать строки, которые уже есть в базе, например '
+                 'при повторном запуске прерванной загрузки.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересобирать счётчики, поиск и ленты после загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        tables = [name for name in options['tables'].split(',') if name]
+        unknown = set(tables) - set(TABLES)
+        if unknown:
+            raise CommandError(
+                'Неизвестные таблицы: ' + ', '.join(sorted(unknown))
+            )
+        for name in TABLES:
+            path = table_path(options['directory'], name)
+            if name not in tables or not os.path.exists(path):
+                continue
+            progress = import_table(
+                name, path, options['batch_size'],
+                options['transaction_size'], options['skip_existing'],
+            )
+            for loaded, rate in progress:
+                self.stdout.write(
+                    f'{name}: {loaded} строк, {rate:.0f} строк/с'
+                )
+        if options['no_rebuild']:
+            return
+        self.stdout.write('Пересборка счётчиков, поиска и лент...')
+        rebuild_derived()
+        call_command('backfill_image_sizes', stdout=self.stdout)
@@ -0,0 +1,99 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from posts import load
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон: поднимает yatube.wsgi.application на '
+            'локальном сервере с несколькими рабочими потоками и гоняет '
+            'по нему параллельных клиентов. Печатает пропускную '
+            'способность и задержки p50/p95/p99 по именам адресов. '
+            'Базу нужно заранее заполнить командой seed_yatube: клиенты '
+            'входят под её пользователями и пишут в неё посты и '
+            'комментарии.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Сколько запросов сервер обрабатывает одновременно.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность прогона в секундах.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{action}={weight}' for action, weight
+                             in load.DEFAULT_MIX.items()),
+            help='Веса действий клиентов: '
+                 + ', '.join(load.DEFAULT_MIX) + '.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--url',
+            help='Нагружать уже запущенный сервер по этому адресу вместо '
+                 'локального.',
+        )
+        parser.add_argument('--username-prefix', default='seed_user_')
+        parser.add_argument('--password', default='yatube-seed')
+        parser.add_argument(
+            '--debug',
+            action='store_true',
+            help='Оставить DEBUG из настроек. По умолчанию сервер '
+                 'работает с DEBUG = False, как в бою.',
+        )
+        parser.add_argument('--json', help='Записать отчёт в этот файл.')
+
+    def handle(self, *args, **options):
+        try:
+            mix = load.parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        server = None
+        base_url = options['url']
+        if base_url is None:
+            if not options['debug']:
+                settings.DEBUG = False
+            from yatube.wsgi import application
+            server = load.start_server(application, options['workers'])
+            host, port = server.server_address[:2]
+            base_url = f'http://{host}:{port}'
+        try:
+            report = load.drive(
+                base_url.rstrip('/'), options['clients'],
+                options['duration'], mix, seed=options['seed'],
+                username_prefix=options['username_prefix'],
+                password=options['password'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        self.print_report(report)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"адрес":<24}{"запросов":>10}{"ошибок":>8}'
+            f'{"p50_ms":>9}{"p95_ms":>9}{"p99_ms":>9}'
+        )
+        for name, row in report['urls'].items():
+            self.stdout.write(
+                f'{name:<24}{row["requests"]:>10}{row["errors"]:>8}'
+                f'{row["p50_ms"]:>9}{row["p95_ms"]:>9}{row["p99_ms"]:>9}'
+            )
+        self.stdout.write(
+            f'Всего запросов: {report["requests"]}, '
+            f'{report["throughput"]} в секунду'
+        )
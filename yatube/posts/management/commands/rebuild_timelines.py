@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = ('Дополняет ленты подписок постами авторов, на которых '
+            'подписаны пользователи, и убирает из них посты популярных '
+            'авторов: их посты подмешиваются при чтении.')
+
+    def handle(self, *args, **options):
+        timeline.rebuild()
+        self.stdout.write('Ленты подписок пересобраны')
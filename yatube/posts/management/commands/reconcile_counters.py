@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from posts.counters import reconcile_posts, reconcile_users
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики комментариев, постов и подписок '
+            'пачками и исправляет разошедшиеся значения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько записей пересчитывать за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = reconcile_posts(chunk_size)
+        self.stdout.write(f'Исправлено постов: {posts}')
+        users = reconcile_users(chunk_size)
+        self.stdout.write(f'Исправлено пользователей: {users}')
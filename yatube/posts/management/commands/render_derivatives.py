@@ -0,0 +1,48 @@
+from core.tasks import get_process_executor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts.images import derivatives_ready, has_derivatives, render_derivatives
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Создаёт в пуле процессов производные картинок постов, '
+            'для которых их ещё нет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Сколько картинок отправлять в пул за один проход.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать производные и для готовых картинок.',
+        )
+
+    def handle(self, *args, **options):
+        self.rendered = 0
+        chunk = []
+        posts = Post.objects.exclude(image='').only('pk', 'image')
+        for post in posts.iterator():
+            if options['force'] or not has_derivatives(post.image):
+                chunk.append(post)
+            if len(chunk) >= options['chunk_size']:
+                self.render(chunk)
+                chunk = []
+        if chunk:
+            self.render(chunk)
+        self.stdout.write(f'Готово, обработано картинок: {self.rendered}')
+
+    def render(self, posts):
+        names = [post.image.name for post in posts]
+        if settings.TASKS_EAGER:
+            list(map(render_derivatives, names))
+        else:
+            list(get_process_executor().map(render_derivatives, names))
+        for post in posts:
+            derivatives_ready(post.pk, post.image.name)
+        self.rendered += len(posts)
+        self.stdout.write(f'Обработано картинок: {self.rendered}')
@@ -0,0 +1,138 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from posts import load, replay
+
+
+class Command(BaseCommand):
+    help = ('Воспроизводит журнал запросов (NDJSON с полями method, path, '
+            'user, timestamp и необязательным status) против приложения и '
+            'записывает задержки по именам адресов. С --compare сравнивает '
+            'два записанных прогона, например до и после изменения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='Файл журнала.')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=1.0,
+            help='Во сколько раз ускорить исходные интервалы между '
+                 'запросами. 0 — отправлять без пауз.',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=16,
+            help='Сколько запросов может выполняться одновременно.',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--url',
+            help='Воспроизводить против уже запущенного сервера.',
+        )
+        parser.add_argument(
+            '--raw-paths',
+            action='store_true',
+            help='Не переносить id постов, группы и профили из путей '
+                 'журнала на данные текущей базы.',
+        )
+        parser.add_argument('--username-prefix', default='seed_user_')
+        parser.add_argument('--password', default='yatube-seed')
+        parser.add_argument(
+            '--debug',
+            action='store_true',
+            help='Оставить DEBUG из настроек локального сервера.',
+        )
+        parser.add_argument('--json', help='Записать отчёт в этот файл.')
+        parser.add_argument(
+            '--compare',
+            nargs=2,
+            metavar=('BEFORE', 'AFTER'),
+            help='Сравнить два отчёта --json вместо воспроизведения.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Допустимый рост p50 и p95 при сравнении, доля.',
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self.compare(*options['compare'], options['threshold'])
+            return
+        if not options['log']:
+            raise CommandError('Укажите файл журнала или --compare.')
+        report = self.replay(options)
+        self.print_report(report)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def replay(self, options):
+        server = None
+        base_url = options['url']
+        if base_url is None:
+            if not options['debug']:
+                settings.DEBUG = False
+            from yatube.wsgi import application
+            server = load.start_server(application, options['workers'])
+            host, port = server.server_address[:2]
+            base_url = f'http://{host}:{port}'
+        try:
+            return replay.replay(
+                base_url.rstrip('/'), options['log'],
+                clients=options['clients'],
+                speed=options['speed'],
+                map_paths=not options['raw_paths'],
+                username_prefix=options['username_prefix'],
+                password=options['password'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"адрес":<24}{"запросов":>10}{"ошибок":>8}'
+            f'{"p50_ms":>9}{"p95_ms":>9}{"p99_ms":>9}'
+        )
+        for name, row in report['urls'].items():
+            self.stdout.write(
+                f'{name:<24}{row["requests"]:>10}{row["errors"]:>8}'
+                f'{row["p50_ms"]:>9}{row["p95_ms"]:>9}{row["p99_ms"]:>9}'
+            )
+        self.stdout.write(
+            f'Всего запросов: {report["requests"]}, '
+            f'{report["throughput"]} в секунду, '
+            f'пропущено записей: {report["skipped"]}'
+        )
+
+    def compare(self, before_path, after_path, threshold):
+        reports = []
+        for path in (before_path, after_path):
+            with open(path, encoding='utf-8') as report:
+                reports.append(json.load(report))
+        rows, regressions = replay.compare(*reports, threshold)
+        self.stdout.write(
+            f'{"адрес":<24}{"p50 до":>9}{"после":>9}{"p95 до":>9}'
+            f'{"после":>9}{"p99 до":>9}{"после":>9}'
+        )
+        for row in rows:
+            cells = []
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+                for side in ('before', 'after'):
+                    cells.append(row[side][metric] if row[side] else '-')
+            self.stdout.write(
+                f'{row["url"]:<24}' + ''.join(f'{c:>9}' for c in cells)
+            )
+        if regressions:
+            raise CommandError(
+                'Задержки выросли больше допустимого: '
+                + ', '.join(regressions)
+            )
+        self.stdout.write('Регрессий нет.')
@@ -0,0 +1,101 @@
+import time
+from argparse import ArgumentTypeError
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from posts.seed import SEED_END, seed
+
+
+def parse_end(value):
+    """Разбирает дату или дату со временем; без часового пояса
+    время считается в UTC."""
+    end = parse_datetime(value)
+    if end is None:
+        date = parse_date(value)
+        if date is None:
+            raise ArgumentTypeError(f'Не дата: {value}')
+        end = datetime(date.year, date.month, date.day)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end, timezone.utc)
+    return end
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных замеров. '
+            'Популярность авторов распределена по Ципфу.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=30000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Начальное значение генератора: один seed на пустой базе '
+                 'даёт одни и те же данные.',
+        )
+        parser.add_argument(
+            '--exponent',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для популярности авторов '
+                 'и постов.',
+        )
+        parser.add_argument(
+            '--image-ratio',
+            type=float,
+            default=0,
+            help='Доля постов с картинкой, от 0 до 1.',
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=20,
+            help='Сколько разных картинок сгенерировать для постов.',
+        )
+        parser.add_argument(
+            '--prefix',
+            default='seed',
+            help='Префикс имён пользователей и адресов групп.',
+        )
+        parser.add_argument(
+            '--password',
+            default='yatube-seed',
+            help='Пароль всех созданных пользователей.',
+        )
+        parser.add_argument(
+            '--end',
+            type=parse_end,
+            default=SEED_END,
+            help='Дата в ISO 8601, к которой приурочен набор: посты и '
+                 'комментарии датируются годом до неё. По умолчанию '
+                 f'{SEED_END.date()}.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+            image_ratio=options['image_ratio'],
+            seed=options['seed'],
+            exponent=options['exponent'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            password=options['password'],
+            end=options['end'],
+        )
+        for name, count in created.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(f'Готово за {time.monotonic() - started:.1f} с')
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+CREATE_SEARCH = """
+CREATE VIRTUAL TABLE posts_search USING fts5(
+    text, post_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2'
+);
+INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2, text, id FROM posts_post;
+INSERT INTO posts_search (rowid, text, post_id)
+    SELECT id * 2 + 1, text, post_id FROM posts_comment;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SEARCH, 'DROP TABLE posts_search;'),
+    ]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def fill_timelines(apps, schema_editor):
+    """Заполняет ленты подписок для подписок, сделанных до появления
+    TimelineEntry. Посты популярных авторов, как и в timeline.rebuild,
+    не раздаются: они подмешиваются при чтении."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    UserStats = apps.get_model('posts', 'UserStats')
+    ops = schema_editor.connection.ops
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            '{insert} {table} (user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            'FROM {follows} follow, {posts} post '
+            'WHERE post.author_id = follow.author_id '
+            'AND follow.author_id NOT IN ('
+            'SELECT user_id FROM {stats} WHERE followers_count >= %s'
+            ') {suffix}'.format(
+                insert=ops.insert_statement(ignore_conflicts=True),
+                table=TimelineEntry._meta.db_table,
+                follows=Follow._meta.db_table,
+                posts=Post._meta.db_table,
+                stats=UserStats._meta.db_table,
+                suffix=ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+            ),
+            [settings.TIMELINE_FANOUT_LIMIT],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
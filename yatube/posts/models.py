@@ -1,8 +1,17 @@
+from core.storage import ContentAddressedStorage
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models.fields.related import ForeignKey
 
 User = get_user_model()
+post_image_storage = ContentAddressedStorage()
+
+
+class StoredImage(models.Model):
+    """Модель считает, сколько постов ссылается на файл картинки в
+    хранилище с адресацией по содержимому."""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
 
 
 class Group(models.Model):
@@ -16,6 +25,14 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Набор запросов к постам."""
+    def feed(self):
+        """Посты для ленты: автор и группа выбираются одним запросом
+        вместе с постами."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     """Модель хранит в себе посты. Текст поста, дата публикации,
     автора и группу в который был написан пост."""
@@ -45,17 +62,65 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_image_storage,
         blank=True,
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        """Сохраняет пост, не трогая comment_count у существующего.
+
+        Счётчик меняется только через F() при добавлении и удалении
+        комментариев: запись всей строки затёрла бы комментарий,
+        добавленный, пока пост редактировали."""
+        if not (self._state.adding or kwargs.get('force_insert')
+                or kwargs.get('update_fields') is not None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comment_count'
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель хранит в себе комментарии к постам. Пост для которого был
@@ -81,6 +146,14 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx',
+            )
+        ]
+
 
 class Follow(models.Model):
     """Модель хранит в себе подписки на авторов. Пользователя который
@@ -103,3 +176,59 @@ class Follow(models.Model):
                 'author'
             ], name='unique_subscription')
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx',
+            )
+        ]
+
+
+class UserStats(models.Model):
+    """Модель хранит счётчики пользователя: число его постов,
+    подписчиков и подписок."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Число подписок',
+        default=0,
+    )
+
+
+class TimelineEntry(models.Model):
+    """Модель хранит материализованную ленту подписок: посты авторов,
+    на которых подписан пользователь, с датой публикации поста."""
+    user = ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=[
+                'user',
+                'post'
+            ], name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            )
+        ]
@@ -0,0 +1,197 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_SEPARATOR = '|'
+# Наибольший первичный ключ: больший id в курсоре база не примет.
+MAX_PK = 2 ** 63 - 1
+FEED_COUNT_CACHE_KEY = 'feed_count:{}'
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(*values):
+    """Упаковывает значения ключа сортировки в непрозрачный токен."""
+    raw = CURSOR_SEPARATOR.join(str(value) for value in values)
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Распаковывает токен обратно в список из size строк."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = urlsafe_b64decode(token + padding).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+    values = raw.rsplit(CURSOR_SEPARATOR, size - 1)
+    if len(values) != size:
+        raise InvalidCursor(token)
+    return values
+
+
+def parse_cursor_pk(value, token):
+    """Разбирает id из курсора: целое от 0 до MAX_PK."""
+    if not value.isdigit() or int(value) > MAX_PK:
+        raise InvalidCursor(token)
+    return int(value)
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (field, id) без COUNT и OFFSET.
+
+    Записи идут от новых к старым. Страница после курсора выбирается
+    условием по ключу, поэтому любая страница стоит столько же,
+    сколько первая, а новые записи не сдвигают уже открытые страницы.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        super().__init__(object_list, per_page)
+        self.field = field
+
+    def get_cursor(self, obj):
+        """Возвращает курсор, указывающий на запись obj."""
+        return encode_cursor(getattr(obj, self.field).isoformat(), obj.pk)
+
+    def parse_cursor(self, token):
+        stamp, pk = decode_cursor(token, 2)
+        stamp = parse_datetime(stamp)
+        if stamp is None:
+            raise InvalidCursor(token)
+        return stamp, parse_cursor_pk(pk, token)
+
+    def get_cursor_page(self, after=None, before=None):
+        """Возвращает страницу записей старше after или новее before.
+
+        Битый курсор, как и неверный номер в Paginator.get_page,
+        приводит к первой странице.
+        """
+        try:
+            if before:
+                return self._page_before(*self.parse_cursor(before))
+            if after:
+                return self._page_after(*self.parse_cursor(after))
+        except InvalidCursor:
+            pass
+        return self._page_after()
+
+    def fetch(self, stamp, pk, descending):
+        """Выбирает per_page + 1 записей за курсором в порядке обхода."""
+        return self.fetch_from(
+            self.object_list, self.field, 'pk', stamp, pk, descending
+        )
+
+    def fetch_from(self, queryset, field, pk_field, stamp, pk, descending):
+        """Выбирает из queryset per_page + 1 записей по ключу
+        (field, pk_field), идущих за курсором (stamp, pk)."""
+        lookup = 'lt' if descending else 'gt'
+        if stamp is not None:
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': stamp})
+                | Q(**{field: stamp, f'{pk_field}__{lookup}': pk})
+            )
+        sign = '-' if descending else ''
+        return list(queryset.order_by(
+            f'{sign}{field}', f'{sign}{pk_field}'
+        )[:self.per_page + 1])
+
+    def _page_after(self, stamp=None, pk=None):
+        rows = self.fetch(stamp, pk, descending=True)
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._build_page(
+            rows, has_previous=stamp is not None, has_next=has_next
+        )
+
+    def _page_before(self, stamp, pk):
+        rows = self.fetch(stamp, pk, descending=False)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._build_page(
+            rows, has_previous=has_previous, has_next=True
+        )
+
+    def _build_page(self, rows, has_previous, has_next):
+        page = Page(rows, None, self)
+        page.previous_cursor = (
+            self.get_cursor(rows[0]) if rows and has_previous else None
+        )
+        page.next_cursor = (
+            self.get_cursor(rows[-1]) if rows and has_next else None
+        )
+        return page
+
+
+def feed_count_cache_key(scope):
+    return FEED_COUNT_CACHE_KEY.format(scope)
+
+
+def cached_count(queryset, scope):
+    """Возвращает число записей ленты scope из кэша или считает его."""
+    return cache.get_or_set(
+        feed_count_cache_key(scope),
+        queryset.count,
+        settings.FEED_COUNT_TIMEOUT,
+    )
+
+
+class FeedPaginator(Paginator):
+    """Нумерованный паджинатор ленты.
+
+    Число записей берётся из кэша по ключу count_key и поддерживается
+    сигналами модели Post, а в навигации выводится только окно номеров
+    вокруг текущей страницы.
+    """
+    def __init__(self, object_list, per_page, count_key=None, window=None):
+        super().__init__(object_list, per_page)
+        self.count_key = count_key
+        self.window = settings.PAGE_WINDOW if window is None else window
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        return cached_count(self.object_list, self.count_key)
+
+    def page(self, number):
+        """Возвращает страницу, не обрезая её по счётчику.
+
+        Кэшированный счётчик может ненадолго отставать, поэтому срез
+        всегда берёт полную страницу."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        page = Page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+        page.page_window = self.get_page_window(number)
+        return page
+
+    def get_page_window(self, number):
+        """Возвращает номера страниц в окне вокруг number."""
+        first = max(number - self.window, 1)
+        last = min(number + self.window, self.num_pages)
+        return range(first, last + 1)
+
+
+def add_page_cursors(page, field='pub_date'):
+    """Добавляет курсоры соседних страниц к обычной странице Paginator.
+
+    Переходы «вперёд» и «назад» с нумерованной страницы тоже идут по
+    курсору и не платят за OFFSET.
+    """
+    cursor_paginator = CursorPaginator(page.paginator.object_list,
+                                       page.paginator.per_page, field)
+    page.previous_cursor = page.next_cursor = None
+    if page.has_previous() and len(page):
+        page.previous_cursor = cursor_paginator.get_cursor(page[0])
+    if page.has_next() and len(page):
+        page.next_cursor = cursor_paginator.get_cursor(page[-1])
+    return page
@@ -0,0 +1,233 @@
+import gzip
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import (FIRST_COMPLETED, ThreadPoolExecutor,
+                                as_completed, wait)
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
+from django.utils.dateparse import parse_datetime
+
+from .load import Dataset, Recorder, VirtualClient, url_name
+
+# Тело POST-запросов в журнале не записано: формы заполняются
+# синтетическим текстом. POST-запросы к другим адресам пропускаются.
+FORM_DATA = {
+    'posts:add_comment': lambda: {'text': 'Комментарий из журнала'},
+    'posts:post_create': lambda: {'text': 'Пост из журнала'},
+    'posts:post_edit': lambda: {'text': 'Пост из журнала'},
+}
+# Вход, выход и регистрация пропускаются: клиенты входят сами, а выход
+# разлогинил бы общего клиента пользователя для следующих запросов.
+SKIPPED_NAMESPACE = 'users:'
+ANONYMOUS = ('', '-', None)
+
+
+def parse_timestamp(value):
+    """Время записи журнала: число секунд или дата в ISO 8601."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    stamp = parse_datetime(value)
+    if stamp is None:
+        raise ValueError(f'Не удалось разобрать время: {value}')
+    return stamp.timestamp()
+
+
+def read_log(path):
+    """Читает журнал NDJSON (можно сжатый gzip): в каждой строке
+    method, path, user, timestamp и, если записан, код ответа
+    status."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            yield {
+                'method': entry.get('method', 'GET').upper(),
+                'path': entry['path'],
+                'user': entry.get('user'),
+                'timestamp': parse_timestamp(entry['timestamp']),
+                'status': entry.get('status'),
+            }
+
+
+def _pick(items, key):
+    """Устойчиво сопоставляет ключу элемент списка: одному и тому же
+    пользователю или посту из журнала всегда достаётся один и тот же
+    объект набора."""
+    digest = hashlib.md5(str(key).encode()).hexdigest()
+    return items[int(digest, 16) % len(items)]
+
+
+class Mapper:
+    """Переносит пользователей и адреса журнала на данные текущей
+    базы: пользователей — на аккаунты seed_yatube, а id постов, группы
+    и профили в путях — на существующие."""
+    def __init__(self, dataset, map_paths=True):
+        self.dataset = dataset
+        self.map_paths = map_paths
+
+    def user(self, user):
+        if user in ANONYMOUS:
+            return None
+        return _pick(self.dataset.usernames, user)
+
+    def path(self, path):
+        if not self.map_paths:
+            return path
+        parts = urlsplit(path)
+        try:
+            match = resolve(parts.path)
+        except Resolver404:
+            return path
+        kwargs = dict(match.kwargs)
+        if 'post_id' in kwargs:
+            kwargs['post_id'] = _pick(self.dataset.post_ids,
+                                      kwargs['post_id'])
+        if 'username' in kwargs:
+            kwargs['username'] = self.user(kwargs['username'])
+        if 'slug' in kwargs and self.dataset.group_slugs:
+            kwargs['slug'] = _pick(self.dataset.group_slugs, kwargs['slug'])
+        try:
+            mapped = reverse(match.view_name, kwargs=kwargs)
+        except NoReverseMatch:
+            return path
+        return mapped + (f'?{parts.query}' if parts.query else '')
+
+
+class Replayer:
+    """Воспроизводит журнал запросов с исходными интервалами,
+    ускоренными в speed раз. При speed = 0 запросы идут без пауз.
+
+    Запросы одного пользователя выполняются по очереди, как из одного
+    браузера; вход выполняется при первом его запросе.
+
+    Успехом считается код ответа из журнала, а если его нет — любой
+    ответ без ошибки. Вошедшего пользователя при этом не должно
+    перенаправлять на страницу входа, а гостя — никуда, кроме неё."""
+    def __init__(self, base_url, mapper, password, clients=16, speed=1.0):
+        self.base_url = base_url
+        self.mapper = mapper
+        self.password = password
+        self.clients = clients
+        self.speed = speed
+        self.recorder = Recorder()
+        self.guest = VirtualClient(base_url, None, self.recorder, None,
+                                   None, password)
+        self.users = {}
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+        self.skipped = 0
+
+    def lock_for(self, username):
+        with self.locks_lock:
+            return self.locks.setdefault(username, threading.Lock())
+
+    def client_for(self, username):
+        """Клиент пользователя, вошедший на сайт. Вызывается под
+        блокировкой этого пользователя."""
+        client = self.users.get(username)
+        if client is None:
+            client = VirtualClient(self.base_url, None, self.recorder, None,
+                                   username, self.password)
+            client.login()
+            self.users[username] = client
+        return client
+
+    def skip(self, entry, name):
+        """Считает и пропускает записи, которые нельзя воспроизвести."""
+        skipped = name.startswith(SKIPPED_NAMESPACE) or (
+            entry['method'] == 'POST' and name not in FORM_DATA
+        )
+        if skipped:
+            with self.locks_lock:
+                self.skipped += 1
+        return skipped
+
+    def send(self, entry):
+        username = self.mapper.user(entry['user'])
+        path = self.mapper.path(entry['path'])
+        name = url_name(path)
+        if self.skip(entry, name):
+            return
+        if username is None:
+            # Гости друг от друга не зависят: у каждого запроса своя
+            # сессия без cookies.
+            self.guest.request(
+                requests.Session(), entry['method'], path,
+                status=entry['status'], location=reverse(settings.LOGIN_URL),
+            )
+            return
+        with self.lock_for(username):
+            client = self.client_for(username)
+            if entry['method'] == 'POST':
+                client.post_form(path, FORM_DATA[name](),
+                                 status=entry['status'] or 302)
+            else:
+                client.request(client.user, entry['method'], path,
+                               status=entry['status'])
+
+    def run(self, entries):
+        """Отправляет записи журнала по расписанию и возвращает отчёт
+        Recorder.report."""
+        started = time.monotonic()
+        first = None
+        with ThreadPoolExecutor(max_workers=self.clients) as executor:
+            # В работе не больше clients записей: журнал читается по
+            # мере отправки и не копится в очереди исполнителя.
+            pending = set()
+            for entry in entries:
+                if first is None:
+                    first = entry['timestamp']
+                if self.speed:
+                    due = started + (entry['timestamp'] - first) / self.speed
+                    time.sleep(max(due - time.monotonic(), 0))
+                if len(pending) >= self.clients:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                pending.add(executor.submit(self.send, entry))
+            for future in as_completed(pending):
+                future.result()
+        report = self.recorder.report(time.monotonic() - started)
+        report['skipped'] = self.skipped
+        return report
+
+
+def replay(base_url, log_path, clients=16, speed=1.0, map_paths=True,
+           username_prefix='seed_user_', password='yatube-seed'):
+    """Воспроизводит журнал log_path против base_url и возвращает
+    отчёт с меткой времени прогона."""
+    mapper = Mapper(Dataset(username_prefix), map_paths)
+    replayer = Replayer(base_url, mapper, password, clients, speed)
+    report = replayer.run(read_log(log_path))
+    report['log'] = log_path
+    report['speed'] = speed
+    report['finished'] = datetime.now().isoformat(timespec='seconds')
+    return report
+
+
+def compare(before, after, threshold):
+    """Сравнивает задержки двух прогонов по именам адресов.
+
+    Возвращает строки сравнения и список регрессий: адресов, у которых
+    p50 или p95 выросли больше чем на threshold."""
+    rows, regressions = [], []
+    for name in sorted(set(before['urls']) | set(after['urls'])):
+        old, new = before['urls'].get(name), after['urls'].get(name)
+        row = {'url': name, 'before': old, 'after': new, 'change': {}}
+        if old and new:
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+                if old[metric]:
+                    row['change'][metric] = new[metric] / old[metric] - 1
+            if any(row['change'].get(metric, 0) > threshold
+                   for metric in ('p50_ms', 'p95_ms')):
+                regressions.append(name)
+        rows.append(row)
+    return rows, regressions
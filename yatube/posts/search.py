@@ -0,0 +1,134 @@
+import re
+
+from django.db import connection
+
+from .models import Post
+from .paginators import (CursorPaginator, InvalidCursor, decode_cursor,
+                         encode_cursor, parse_cursor_pk)
+
+SEARCH_TABLE = 'posts_search'
+WORD_RE = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Превращает строку поиска в запрос FTS5: каждое слово ищется
+    как префикс, все слова обязательны."""
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def _post_rowid(post_id):
+    return post_id * 2
+
+
+def _comment_rowid(comment_id):
+    return comment_id * 2 + 1
+
+
+def _index(rowid, text, post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, text, post_id) '
+            'VALUES (%s, %s, %s)',
+            [rowid, text, post_id],
+        )
+
+
+def _unindex(rowid):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [rowid]
+        )
+
+
+def index_post(post):
+    _index(_post_rowid(post.pk), post.text, post.pk)
+
+
+def unindex_post(post):
+    _unindex(_post_rowid(post.pk))
+
+
+def index_comment(comment):
+    _index(_comment_rowid(comment.pk), comment.text, comment.post_id)
+
+
+def unindex_comment(comment):
+    _unindex(_comment_rowid(comment.pk))
+
+
+def rebuild_index():
+    """Заново заполняет поисковый индекс из постов и комментариев."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+            'SELECT id * 2, text, id FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, post_id) '
+            'SELECT id * 2 + 1, text, post_id FROM posts_comment'
+        )
+
+
+def matching_post_ids_sql(expression):
+    """Подзапрос id постов, текст или комментарии которых подходят
+    под выражение FTS5."""
+    return (
+        f'SELECT post_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [expression],
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный паджинатор результатов поиска.
+
+    Пост попадает в выдачу, если запросу отвечает его текст или
+    любой комментарий к нему, и ранжируется по лучшему совпадению
+    (bm25). Курсор — пара (rank, id) последнего поста на странице.
+    """
+    def __init__(self, query, per_page):
+        super().__init__([], per_page, field='rank')
+        self.expression = match_expression(query)
+
+    def get_cursor(self, obj):
+        return encode_cursor(repr(obj.rank), obj.pk)
+
+    def parse_cursor(self, token):
+        rank, pk = decode_cursor(token, 2)
+        try:
+            rank = float(rank)
+        except ValueError:
+            raise InvalidCursor(token)
+        return rank, parse_cursor_pk(pk, token)
+
+    def fetch(self, rank, pk, descending):
+        """Выбирает per_page + 1 постов за курсором. Обход вперёд
+        (descending) идёт от лучших совпадений к худшим."""
+        if not self.expression:
+            return []
+        lookup = '>' if descending else '<'
+        order = 'ASC' if descending else 'DESC'
+        having, params = '', [self.expression]
+        if rank is not None:
+            having = (
+                f'HAVING score {lookup} %s '
+                f'OR (score = %s AND post_id {lookup} %s)'
+            )
+            params += [rank, rank, pk]
+        params.append(self.per_page + 1)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, MIN(rank) AS score FROM {SEARCH_TABLE} '
+                f'WHERE {SEARCH_TABLE} MATCH %s GROUP BY post_id {having} '
+                f'ORDER BY score {order}, post_id {order} LIMIT %s',
+                params,
+            )
+            ranks = cursor.fetchall()
+        posts = Post.objects.feed().in_bulk([post_id for post_id, _ in ranks])
+        rows = []
+        for post_id, rank in ranks:
+            if post_id in posts:
+                post = posts[post_id]
+                post.rank = rank
+                rows.append(post)
+        return rows
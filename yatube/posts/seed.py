@@ -0,0 +1,229 @@
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .exchange import preserved_timestamps, rebuild_derived
+from .models import Comment, Follow, Group, Post, post_image_storage
+
+User = get_user_model()
+
+# Конец интервала дат набора по умолчанию. Даты отсчитываются от него,
+# а не от текущего времени, чтобы seed давал те же данные в любой день.
+SEED_END = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+WORDS = (
+    'котик', 'лето', 'город', 'книга', 'кофе', 'дорога', 'море', 'код',
+    'музыка', 'утро', 'дождь', 'друг', 'поезд', 'сад', 'вечер', 'снег',
+    'работа', 'фильм', 'горы', 'новость', 'хлеб', 'окно', 'звезда', 'чай',
+)
+
+
+class ZipfChoice:
+    """Выбирает элементы с вероятностью, обратной степени их ранга:
+    первый элемент выбирается чаще всех, хвост — редко."""
+    def __init__(self, population, exponent, rng):
+        self.population = population
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(population) + 1)
+        ))
+
+    def __call__(self):
+        point = self.rng.random() * self.cum_weights[-1]
+        return self.population[bisect(self.cum_weights, point)]
+
+
+class Seeder:
+    """Генерирует синтетический набор данных.
+
+    Популярность авторов распределена по Ципфу: от неё зависят и число
+    их постов, и число подписчиков. Один и тот же seed на пустой базе
+    даёт одни и те же данные. Даты лежат в последних days днях перед
+    end."""
+    def __init__(self, seed=0, exponent=1.1, batch_size=1000,
+                 prefix='seed', password='yatube-seed', days=365,
+                 end=SEED_END):
+        self.rng = random.Random(seed)
+        self.exponent = exponent
+        self.batch_size = batch_size
+        self.prefix = prefix
+        # Пароль хэшируется один раз: все пользователи набора могут
+        # войти с ним, а генерация не тратит время на хэширование.
+        self.password = make_password(password)
+        self.end = end
+        self.days = days
+
+    def _insert(self, model, objects):
+        """Вставляет объекты пачками по batch_size, не держа в памяти
+        больше одной пачки."""
+        batch, total = [], 0
+        with preserved_timestamps(model):
+            for obj in objects:
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    model.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            model.objects.bulk_create(batch)
+        return total + len(batch)
+
+    def _text(self, low, high):
+        return ' '.join(
+            self.rng.choice(WORDS)
+            for _ in range(self.rng.randint(low, high))
+        ).capitalize()
+
+    def _moment(self):
+        return self.end - timedelta(
+            seconds=self.rng.randrange(self.days * 24 * 60 * 60)
+        )
+
+    def users(self, count):
+        self._insert(User, (
+            User(
+                username=f'{self.prefix}_user_{number}',
+                first_name='Имя',
+                last_name=f'Фамилия {number}',
+                password=self.password,
+                date_joined=self.end - timedelta(days=self.days),
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{self.prefix}_user_'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def groups(self, count):
+        self._insert(Group, (
+            Group(
+                title=f'Сообщество {number}',
+                slug=f'{self.prefix}-group-{number}',
+                description=self._text(5, 20),
+            )
+            for number in range(count)
+        ))
+        return list(Group.objects.filter(
+            slug__startswith=f'{self.prefix}-group-'
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def images(self, count):
+        """Сохраняет count небольших картинок разных цветов и размеров
+        и возвращает список (имя, ширина, высота)."""
+        images = []
+        for number in range(count):
+            size = (self.rng.randint(320, 1280), self.rng.randint(240, 960))
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new('RGB', size, color).save(
+                buffer, format='JPEG', quality=settings.IMAGE_JPEG_QUALITY
+            )
+            name = post_image_storage.save(
+                f'posts/{self.prefix}_{number}.jpg',
+                ContentFile(buffer.getvalue()),
+            )
+            images.append((name, *size))
+        return images
+
+    def posts(self, count, authors, groups, images=(), image_ratio=0):
+        """Создаёт посты: автора выбирает распределение Ципфа, группа
+        есть у двух постов из трёх."""
+        if not authors:
+            return []
+        choose_author = ZipfChoice(authors, self.exponent, self.rng)
+        first_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        def build():
+            for _ in range(count):
+                post = Post(
+                    text=self._text(5, 60),
+                    author_id=choose_author(),
+                    group_id=(self.rng.choice(groups)
+                              if groups and self.rng.random() < 2 / 3
+                              else None),
+                    pub_date=self._moment(),
+                )
+                if images and self.rng.random() < image_ratio:
+                    (post.image, post.image_width,
+                     post.image_height) = self.rng.choice(images)
+                yield post
+
+        self._insert(Post, build())
+        return list(Post.objects.filter(pk__gt=first_pk).order_by(
+            'pk').values_list('pk', 'pub_date'))
+
+    def comments(self, count, posts, authors):
+        """Создаёт комментарии: популярность постов тоже по Ципфу,
+        комментарий всегда позже поста."""
+        if not posts or not authors:
+            return 0
+        ranked = posts[:]
+        self.rng.shuffle(ranked)
+        choose_post = ZipfChoice(ranked, self.exponent, self.rng)
+
+        def build():
+            for _ in range(count):
+                post_id, pub_date = choose_post()
+                yield Comment(
+                    post_id=post_id,
+                    author_id=self.rng.choice(authors),
+                    text=self._text(2, 20),
+                    created=pub_date + (self.end - pub_date) * (
+                        self.rng.random()
+                    ),
+                )
+
+        return self._insert(Comment, build())
+
+    def follows(self, count, users):
+        """Создаёт до count подписок: подписчик выбирается равномерно,
+        автор — по Ципфу, поэтому у популярных авторов тысячи
+        подписчиков, а у большинства единицы."""
+        if len(users) < 2:
+            return 0
+        choose_author = ZipfChoice(users, self.exponent, self.rng)
+        pairs = set()
+        for _ in range(count * 3):
+            if len(pairs) >= count:
+                break
+            user_id, author_id = self.rng.choice(users), choose_author()
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        self._insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in sorted(pairs)
+        ))
+        return len(pairs)
+
+
+def seed(users, groups, posts, comments, follows, images=0,
+         image_ratio=0, **options):
+    """Генерирует набор данных и пересобирает счётчики, поиск и
+    ленты. Возвращает число созданных строк по таблицам."""
+    seeder = Seeder(**options)
+    with transaction.atomic():
+        user_ids = seeder.users(users)
+        group_ids = seeder.groups(groups)
+        image_files = seeder.images(images) if image_ratio else ()
+        post_rows = seeder.posts(posts, user_ids, group_ids, image_files,
+                                 image_ratio)
+        comment_count = seeder.comments(comments, post_rows, user_ids)
+        follow_count = seeder.follows(follows, user_ids)
+    rebuild_derived()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_rows),
+        'comments': comment_count,
+        'follows': follow_count,
+    }
@@ -0,0 +1,207 @@
+from core.middleware import purge_surrogate_keys
+from core.tasks import run_in_background
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import images, search, timeline
+from .counters import shift_comment_count, shift_user_counter
+from .feed_cache import bump_feed_generation, bump_page_generation
+from .models import Comment, Follow, Group, Post
+from .paginators import feed_count_cache_key
+
+
+def shift_feed_counts(scopes, delta):
+    """Сдвигает кэшированные счётчики лент на delta.
+
+    Отсутствующий в кэше счётчик пропускается: при следующем
+    обращении он будет посчитан заново."""
+    for scope in scopes:
+        try:
+            cache.incr(feed_count_cache_key(scope), delta)
+        except ValueError:
+            pass
+
+
+def post_feed_scopes(post, group_id):
+    scopes = ['posts', f'author:{post.author_id}']
+    if group_id is not None:
+        scopes.append(f'group:{group_id}')
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Запоминает прежние группу и картинку редактируемого поста."""
+    if instance.pk is not None:
+        previous = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image'
+        ).first()
+        if previous is not None:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        shift_feed_counts(post_feed_scopes(instance, instance.group_id), 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id is not None:
+            shift_feed_counts([f'group:{previous_group_id}'], -1)
+        if instance.group_id is not None:
+            shift_feed_counts([f'group:{instance.group_id}'], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    shift_feed_counts(post_feed_scopes(instance, instance.group_id), -1)
+
+
+@receiver([post_save, post_delete], sender=Post)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_feed_cache(sender, **kwargs):
+    bump_feed_generation()
+
+
+@receiver([post_save, post_delete], sender=Follow)
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_pages(sender, update_fields=None, **kwargs):
+    """Подписки и данные пользователя видны только на страницах
+    целиком, ленты во фрагментах от них не зависят. Вход на сайт
+    обновляет лишь last_login и страниц не меняет."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_page_generation()
+
+
+@receiver([post_save, post_delete], sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    keys = ['posts', f'post:{instance.pk}', f'user:{instance.author_id}']
+    for group_id in (instance.group_id,
+                     getattr(instance, '_previous_group_id', None)):
+        if group_id is not None:
+            keys.append(f'group:{group_id}')
+    purge_surrogate_keys(*keys)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    purge_surrogate_keys(f'post:{instance.post_id}')
+
+
+@receiver([post_save, post_delete], sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    purge_surrogate_keys(f'group:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def purge_user_pages(sender, instance, **kwargs):
+    purge_surrogate_keys(f'user:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    purge_surrogate_keys(f'user:{instance.author_id}')
+
+
+@receiver(post_save, sender=Post)
+def count_created_post(sender, instance, created, **kwargs):
+    if created:
+        shift_user_counter(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_deleted_post(sender, instance, **kwargs):
+    shift_user_counter(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_created_comment(sender, instance, created, **kwargs):
+    if created:
+        shift_comment_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_deleted_comment(sender, instance, **kwargs):
+    shift_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_created_follow(sender, instance, created, **kwargs):
+    if created:
+        shift_user_counter(instance.author_id, 'followers_count', 1)
+        shift_user_counter(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_deleted_follow(sender, instance, **kwargs):
+    shift_user_counter(instance.author_id, 'followers_count', -1)
+    shift_user_counter(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_saved_comment(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_deleted_comment(sender, instance, **kwargs):
+    search.unindex_comment(instance)
+
+
+@receiver(post_save, sender=Post)
+def retain_post_image(sender, instance, created, **kwargs):
+    previous_image = getattr(instance, '_previous_image', '')
+    if created or previous_image != instance.image.name:
+        images.release(previous_image)
+        images.retain(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    images.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        run_in_background(timeline.fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if not created:
+        return
+    if timeline.crossed_fanout_limit(instance.author_id, 1):
+        # Автор стал популярным: его посты убираются из всех лент и
+        # дальше подмешиваются при чтении.
+        run_in_background(timeline.rebuild, instance.author_id)
+    else:
+        run_in_background(
+            timeline.backfill, instance.user_id, instance.author_id
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    run_in_background(timeline.trim, instance.user_id, instance.author_id)
+    if timeline.crossed_fanout_limit(instance.author_id, -1):
+        # Автор перестал быть популярным: его посты раздаются по лентам
+        # всех подписчиков.
+        run_in_background(timeline.rebuild, instance.author_id)
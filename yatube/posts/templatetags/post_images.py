@@ -0,0 +1,49 @@
+import hashlib
+
+from django import template
+from django.urls import reverse
+from django.utils.html import format_html
+from posts.images import DERIVATIVES, derivative_size, get_derivative
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def derivative(context, image, kind):
+    """Возвращает готовую производную картинки поста или None.
+
+    Тег только ищет миниатюру и никогда не создаёт её в запросе.
+    Сначала он смотрит в request.derivatives, заполненный
+    prefetch_derivatives для всей страницы."""
+    derivatives = getattr(context.get('request'), 'derivatives', {})
+    if image and (image.name, kind) in derivatives:
+        return derivatives[image.name, kind]
+    return get_derivative(image, kind)
+
+
+@register.simple_tag
+def derivative_srcset(post, kind):
+    """Возвращает srcset из адресов, по которым производные картинки
+    отдаются в формате, выбранном по заголовку Accept.
+
+    В адрес добавлен отпечаток имени файла: при замене картинки адрес
+    меняется, и браузер не покажет закэшированную старую."""
+    version = hashlib.md5(post.image.name.encode()).hexdigest()[:8]
+    return ', '.join(
+        reverse('posts:post_image', args=[post.pk, kind, width])
+        + f'?v={version} {width}w'
+        for width in DERIVATIVES[kind]['widths']
+    )
+
+
+@register.simple_tag
+def derivative_sizes(kind):
+    return DERIVATIVES[kind]['sizes']
+
+
+@register.simple_tag
+def derivative_dimensions(post, kind):
+    """Возвращает атрибуты width и height картинки карточки, чтобы
+    браузер оставил под неё место до загрузки."""
+    width, height = derivative_size(post, kind)
+    return format_html('width="{}" height="{}"', width, height)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_SIZE=3)
+class TestFeedApi(TestCase):
+    """Класс для проверки JSON API лент."""
+    POST_COUNT = 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.other = User.objects.create(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.user,
+                group=cls.group,
+            )
+            for i in range(cls.POST_COUNT)
+        ]
+        cls.other_post = Post.objects.create(
+            text='Чужой пост', author=cls.other
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def test_feed_pages_by_cursor(self):
+        """Проверяет, что лента отдаётся по курсору от новых постов
+        к старым без пропусков и повторов."""
+        url = reverse('posts:api:profile', args=[self.user.username])
+        first = self.get_json(url)
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNone(first['previous'])
+        second = self.get_json(url, after=first['next'])
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(
+            ids, [post.pk for post in reversed(self.posts)],
+            'Посты в ленте идут не по порядку',
+        )
+
+    def test_feeds_filter_posts(self):
+        """Проверяет, что лента группы и профиля содержат только свои
+        посты."""
+        group = self.get_json(
+            reverse('posts:api:group_list', args=[self.group.slug])
+        )
+        self.assertNotIn(
+            self.other_post.pk, [post['id'] for post in group['results']]
+        )
+        profile = self.get_json(
+            reverse('posts:api:profile', args=[self.other.username])
+        )
+        self.assertEqual(
+            [post['id'] for post in profile['results']], [self.other_post.pk]
+        )
+
+    def test_sparse_fields(self):
+        """Проверяет, что fields ограничивает поля ответа и запросы."""
+        url = reverse('posts:api:index')
+        with self.assertNumQueries(1):
+            data = self.get_json(url, fields='id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        full = self.get_json(url)['results'][0]
+        self.assertEqual(full['author'], self.other.username)
+        self.assertIsNone(full['group'])
+        self.assertIsNone(full['image'])
+
+    def test_unknown_field_rejected(self):
+        """Проверяет, что неизвестное поле даёт ошибку 400."""
+        response = self.client.get(
+            reverse('posts:api:index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_empty_fields_ignored(self):
+        """Проверяет, что пустые элементы fields пропускаются."""
+        url = reverse('posts:api:index')
+        full = self.get_json(url)['results'][0]
+        self.assertEqual(self.get_json(url, fields=',')['results'][0], full)
+        data = self.get_json(url, fields='id,,text,')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+
+    def test_batch_keeps_requested_order(self):
+        """Проверяет, что ids отдаёт посты в порядке запроса и пропускает
+        несуществующие."""
+        ids = [self.posts[2].pk, 999999, self.posts[0].pk]
+        data = self.get_json(
+            reverse('posts:api:index'),
+            ids=','.join(map(str, ids)), fields='id',
+        )
+        self.assertEqual(
+            data['results'],
+            [{'id': self.posts[2].pk}, {'id': self.posts[0].pk}],
+        )
+
+    @override_settings(API_MAX_IDS=2)
+    def test_batch_limits(self):
+        """Проверяет, что слишком длинный, битый или выходящий за
+        пределы ключа ids даёт 400."""
+        url = reverse('posts:api:index')
+        for ids in ('1,2,3', '1,x', '99999999999999999999', '1,-1', '0'):
+            with self.subTest(ids=ids):
+                response = self.client.get(url, {'ids': ids})
+                self.assertEqual(response.status_code, 400)
+
+    def test_etag_revalidation(self):
+        """Проверяет, что совпавший ETag даёт 304, а изменённая лента —
+        новый ETag."""
+        url = reverse('posts:api:index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'), 'ETag должен быть сильным')
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        Post.objects.create(text='Новый пост', author=self.user)
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
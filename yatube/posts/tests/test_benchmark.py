@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from posts.benchmark import SCENARIOS, compare, percentile
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestBenchmark(TestCase):
+    """Класс для проверки замеров страниц и сравнения с базовой
+    линией."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.user, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Коммент'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.baseline = os.path.join(self.directory, 'baseline.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def benchmark(self, *args):
+        call_command(
+            'benchmark_views', '--current-db', '--iterations=2',
+            '--warmup=1', f'--baseline={self.baseline}', *args,
+            stdout=StringIO(),
+        )
+
+    def test_percentile(self):
+        """Проверяет процентили по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_compare_flags_regressions(self):
+        """Проверяет, что любой лишний запрос считается регрессией,
+        время сверх порога — предупреждением, а со strict — тоже
+        регрессией, шум в пределах порога не отмечается."""
+        baseline = {'index': {'p50_ms': 10, 'p90_ms': 20, 'queries': 3,
+                              'peak_kb': 100}}
+        within = {'index': {'p50_ms': 11, 'p90_ms': 20, 'queries': 3,
+                            'peak_kb': 100}}
+        self.assertEqual(compare(within, baseline, 0.25), ([], []))
+        slower = {'index': {'p50_ms': 13, 'p90_ms': 20, 'queries': 4,
+                            'peak_kb': 100}}
+        regressions, warnings = compare(slower, baseline, 0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('index.queries'))
+        self.assertEqual(len(warnings), 1)
+        self.assertTrue(warnings[0].startswith('index.p50_ms'))
+        regressions, warnings = compare(slower, baseline, 0.25, strict=True)
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(warnings, [])
+
+    def test_command_saves_and_checks_baseline(self):
+        """Проверяет, что команда записывает базовую линию со всеми
+        замерами, не падает от роста времени и падает, если страница
+        стала делать больше запросов."""
+        self.benchmark('--save-baseline')
+        with open(self.baseline) as baseline:
+            saved = json.load(baseline)['results']
+        self.assertEqual(set(saved), set(SCENARIOS))
+        self.assertGreater(saved['follow_index']['queries'], 0)
+        for metrics in saved.values():
+            metrics['p50_ms'] /= 10
+        with open(self.baseline, 'w') as baseline:
+            json.dump({'results': saved}, baseline)
+        self.benchmark()
+        for metrics in saved.values():
+            metrics['queries'] -= 1
+        with open(self.baseline, 'w') as baseline:
+            json.dump({'results': saved}, baseline)
+        with self.assertRaises(CommandError):
+            self.benchmark()
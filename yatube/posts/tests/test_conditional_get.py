@@ -0,0 +1,173 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestConditionalGet(TestCase):
+    """Класс для проверки ответов 304 на страницах лент и поста."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group,
+        )
+        cls.adresses = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.user.username]),
+            reverse('posts:post_datail', args=[cls.post.pk]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_unchanged_page_not_modified(self):
+        """Проверяет, что совпавший ETag даёт 304 без отрисовки
+        страницы."""
+        for adress in self.adresses:
+            with self.subTest(adress=adress):
+                etag = self.authorized_client.get(adress)['ETag']
+                response = self.authorized_client.get(
+                    adress, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(
+                    response.templates, 'Страница отрисована для 304'
+                )
+
+    def test_guest_if_modified_since(self):
+        """Проверяет, что гость получает Last-Modified и 304 по
+        If-Modified-Since, в том числе из кэша страниц."""
+        for adress in self.adresses:
+            with self.subTest(adress=adress):
+                last_modified = Client().get(adress)['Last-Modified']
+                for attempt in range(2):
+                    response = Client().get(
+                        adress, HTTP_IF_MODIFIED_SINCE=last_modified
+                    )
+                    self.assertEqual(response.status_code, 304)
+
+    def test_user_page_has_no_last_modified(self):
+        """Проверяет, что страница пользователя не отдаёт Last-Modified:
+        она зависит от того, кто вошёл."""
+        response = self.authorized_client.get(self.adresses[0])
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_etag_depends_on_user(self):
+        """Проверяет, что ETag гостя не подходит вошедшему
+        пользователю."""
+        etag = Client().get(self.adresses[0])['ETag']
+        response = self.authorized_client.get(
+            self.adresses[0], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_changes_refresh_etag(self):
+        """Проверяет, что новый комментарий и подписка меняют ETag,
+        а вход пользователя — нет."""
+        adress = reverse('posts:profile', args=[self.user.username])
+        changes = {
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Коммент'
+            ),
+            'follow': lambda: Follow.objects.create(
+                user=self.reader, author=self.user
+            ),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                etag = self.authorized_client.get(adress)['ETag']
+                change()
+                response = self.authorized_client.get(
+                    adress, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+        etag = self.authorized_client.get(adress)['ETag']
+        Client().force_login(self.user)
+        response = self.authorized_client.get(
+            adress, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304,
+                         'Вход пользователя сбросил ETag страниц')
+
+    def test_new_login_refreshes_etag(self):
+        """Проверяет, что после выхода и нового входа старая копия
+        страницы с формой и прежним CSRF-токеном не подтверждается."""
+        User.objects.create_user(username='relogin', password='password')
+        client = Client()
+        client.login(username='relogin', password='password')
+        adress = reverse('posts:post_datail', args=[self.post.pk])
+        client.get(adress)
+        etag = client.get(adress)['ETag']
+        client.logout()
+        client.login(username='relogin', password='password')
+        response = client.get(adress, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_rounded_up(self):
+        """Проверяет, что Last-Modified округляется вверх до секунды и
+        не отдаётся, пока она не прошла: второе изменение в ту же
+        секунду не даёт 304 на устаревшую копию."""
+        adress = reverse('posts:group_list', args=[self.group.slug])
+        with mock.patch('posts.feed_cache.time') as clock:
+            now = clock.time
+            now.return_value = 1000.2
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Первый'
+            )
+            now.return_value = 1000.5
+            response = Client().get(reverse('posts:index'))
+            self.assertFalse(response.has_header('Last-Modified'))
+            now.return_value = 1001.5
+            last_modified = Client().get(adress)['Last-Modified']
+            self.assertEqual(last_modified, http_date(1001))
+            now.return_value = 1001.7
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Второй'
+            )
+            now.return_value = 1002.5
+            response = Client().get(
+                adress, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(PAGE_VALIDATOR_TIMEOUT=60)
+    def test_validators_expire(self):
+        """Проверяет, что ETag и Last-Modified перестают подтверждаться
+        через PAGE_VALIDATOR_TIMEOUT, даже если поколение не сменилось."""
+        adress = reverse('posts:index')
+        with mock.patch('posts.feed_cache.time') as clock:
+            now = clock.time
+            now.return_value = 6010.0
+            etag = self.authorized_client.get(adress)['ETag']
+            last_modified = self.client.get(adress)['Last-Modified']
+            now.return_value = 6070.0
+            response = self.authorized_client.get(
+                adress, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            # Страница гостя лежит в кэше страниц со своими заголовками
+            # до ANONYMOUS_PAGE_CACHE_TIMEOUT.
+            cache.clear()
+            response = self.client.get(
+                adress, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+            self.assertEqual(response.status_code, 200)
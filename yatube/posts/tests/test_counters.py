@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class TestCounters(TestCase):
+    """Класс для проверки денормализованных счётчиков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='user',
+        )
+        cls.author = User.objects.create(
+            username='auth',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=self.author,
+        )
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_comment_count(self):
+        """Проверяет, что счётчик комментариев следует за комментариями."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_edit_keeps_concurrent_comment_count(self):
+        """Проверяет, что редактирование поста не затирает счётчик
+        комментария, добавленного во время редактирования."""
+        client = Client()
+        client.force_login(self.author)
+        stale = Post.objects.get(pk=self.post.pk)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        with mock.patch('posts.views.get_object_or_404', return_value=stale):
+            client.post(
+                reverse('posts:post_edit', args=[self.post.pk]),
+                {'text': 'Изменённый пост'},
+            )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Изменённый пост')
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_user_counters(self):
+        """Проверяет счётчики постов и подписок пользователя."""
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.user).following_count, 1)
+        Follow.objects.filter(user=self.user).delete()
+        self.post.delete()
+        stats = self.get_stats(self.author)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertEqual(self.get_stats(self.user).following_count, 0)
+
+    def test_reconcile_counters(self):
+        """Проверяет, что команда исправляет разошедшиеся счётчики."""
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        Post.objects.update(comment_count=5)
+        UserStats.objects.filter(user=self.author).update(posts_count=3)
+        UserStats.objects.filter(user=self.user).delete()
+        out = StringIO()
+        call_command('reconcile_counters', chunk_size=1, stdout=out)
+        self.assertIn('Исправлено постов: 1', out.getvalue())
+        self.assertIn('Исправлено пользователей: 2', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.user).posts_count, 0)
@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase
+from django.utils import timezone
+from posts import exchange
+from posts.exchange import read_table, table_path
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.search import SearchPaginator
+
+User = get_user_model()
+
+
+class TestExport(TransactionTestCase):
+    """Класс для проверки выгрузки данных в NDJSON."""
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.user = User.objects.create_user(
+            username='auth', email='auth@example.com', password='secret'
+        )
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.posts = [
+            Post.objects.create(
+                text=f'Тестовый пост {i}', author=self.user, group=self.group
+            )
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Коммент'
+        )
+        Follow.objects.create(user=self.reader, author=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, *args):
+        call_command('export_yatube', self.directory, '--chunk-size=2',
+                     *args, stdout=StringIO())
+
+    def rows(self, name):
+        return list(read_table(table_path(self.directory, name)))
+
+    def test_export_all_tables(self):
+        """Проверяет, что выгружаются все таблицы по возрастанию pk."""
+        self.export()
+        self.assertEqual(
+            [row['id'] for row in self.rows('posts')],
+            [post.pk for post in self.posts],
+        )
+        self.assertEqual(self.rows('posts')[0]['group_id'], self.group.pk)
+        self.assertEqual(self.rows('comments')[0]['text'], 'Коммент')
+        self.assertEqual(self.rows('follows')[0]['author_id'], self.user.pk)
+        self.assertEqual(self.rows('groups')[0]['slug'], 'test_slug')
+
+    def test_tables_read_from_one_snapshot(self):
+        """Проверяет, что по умолчанию все таблицы читаются в одной
+        транзакции, а с --jobs выгрузка всё так же полна."""
+        transactions = []
+
+        def export_table(*args):
+            transactions.append(connection.in_atomic_block)
+            return original(*args)
+
+        original = exchange.export_table
+        with mock.patch('posts.exchange.export_table', export_table):
+            self.export()
+        self.assertEqual(transactions, [True] * len(exchange.TABLES))
+        shutil.rmtree(self.directory)
+        self.export('--jobs=3')
+        self.assertEqual(len(self.rows('posts')), len(self.posts))
+
+    def test_users_exported_without_secrets(self):
+        """Проверяет, что пароли и почта пользователей не выгружаются."""
+        self.export('--tables=users')
+        for row in self.rows('users'):
+            self.assertNotIn('password', row)
+            self.assertNotIn('email', row)
+        self.assertFalse(
+            os.path.exists(table_path(self.directory, 'posts')),
+            'Выгружена таблица, которую не просили',
+        )
+
+    def test_resume_from_watermark(self):
+        """Проверяет, что resume дописывает только новые строки и
+        отбрасывает недописанный хвост файла."""
+        self.export('--tables=posts')
+        with open(table_path(self.directory, 'posts'), 'ab') as raw:
+            raw.write(b'\x1f\x8b oborvannaya pachka')
+        new_post = Post.objects.create(text='Новый пост', author=self.user)
+        self.export('--tables=posts', '--resume')
+        self.assertEqual(
+            [row['id'] for row in self.rows('posts')],
+            [post.pk for post in self.posts] + [new_post.pk],
+        )
+
+
+class TestImport(TransactionTestCase):
+    """Класс для проверки загрузки выгрузки через bulk_create."""
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        user = User.objects.create_user(username='auth', password='secret')
+        reader = User.objects.create(username='reader')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        post = Post.objects.create(
+            text='Старый пост про котиков', author=user, group=group
+        )
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        Comment.objects.create(post=post, author=reader, text='Коммент')
+        Follow.objects.create(user=reader, author=user)
+        self.original = Post.objects.values('pk', 'pub_date').get()
+        call_command('export_yatube', self.directory, stdout=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_import_restores_rows_and_derived_data(self):
+        """Проверяет, что загрузка сохраняет id и даты и пересобирает
+        счётчики, поиск и ленту подписок."""
+        out = StringIO()
+        call_command('import_yatube', self.directory, '--batch-size=1',
+                     stdout=out)
+        self.assertIn('строк/с', out.getvalue())
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.original['pk'])
+        self.assertEqual(post.pub_date, self.original['pub_date'],
+                         'Дата публикации заменена временем загрузки')
+        self.assertEqual(post.comment_count, 1)
+        author = User.objects.get(username='auth')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(author.stats.posts_count, 1)
+        self.assertEqual(author.stats.followers_count, 1)
+        reader = User.objects.get(username='reader')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists(),
+            'Лента подписок не пересобрана',
+        )
+        self.assertEqual(
+            [found.pk for found in
+             SearchPaginator('котиков', 10).get_cursor_page()],
+            [post.pk],
+        )
+
+    def test_skip_existing_allows_rerun(self):
+        """Проверяет, что повторная загрузка с --skip-existing не
+        дублирует строки."""
+        for attempt in range(2):
+            call_command('import_yatube', self.directory, '--skip-existing',
+                         '--no-rebuild', stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Comment.objects.count(), 1)
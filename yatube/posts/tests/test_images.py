@@ -0,0 +1,324 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from posts.forms import PostForm
+from posts.images import accepted_formats, has_derivatives
+from posts.models import Post, StoredImage
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def small_gif(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestDerivatives(TestCase):
+    """Класс для проверки заранее созданных миниатюр."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_create_renders_derivatives(self):
+        """Проверяет, что миниатюры создаются при публикации поста
+        и выводятся в ленте."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': small_gif()},
+        )
+        post = Post.objects.get()
+        self.assertTrue(has_derivatives(post.image))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, settings.MEDIA_URL + 'cache/')
+        self.assertNotContains(response, 'placeholder.svg')
+
+    def test_placeholder_until_backfill(self):
+        """Проверяет, что без миниатюры выводится заглушка, а команда
+        создаёт недостающие миниатюры."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=small_gif()
+        )
+        self.assertFalse(has_derivatives(post.image))
+        response = self.authorized_client.get(
+            reverse('posts:post_datail', args=[post.pk])
+        )
+        self.assertContains(response, 'placeholder.svg')
+        out = StringIO()
+        call_command('render_derivatives', stdout=out)
+        self.assertIn('обработано картинок: 1', out.getvalue())
+        self.assertTrue(has_derivatives(post.image))
+        response = self.authorized_client.get(
+            reverse('posts:post_datail', args=[post.pk])
+        )
+        self.assertNotContains(response, 'placeholder.svg')
+
+    def test_page_derivatives_prefetched(self):
+        """Проверяет, что миниатюры страницы ищутся в kvstore одним
+        запросом."""
+        for i in range(3):
+            Post.objects.create(
+                text=f'Пост {i}', author=self.user,
+                image=jpeg((10, 10 + i)),
+            )
+        call_command('render_derivatives', stdout=StringIO())
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertNotContains(response, 'placeholder.svg')
+
+    def test_image_size_stored_and_rendered(self):
+        """Проверяет, что размер картинки сохраняется при загрузке,
+        а карточки выводят размеры и ленивую загрузку после первой."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост с картинкой', 'image': jpeg((40, 20))},
+        )
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        Post.objects.create(
+            text='Второй пост', author=self.user, image=jpeg((30, 20))
+        )
+        call_command('render_derivatives', stdout=StringIO())
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="339"', count=2)
+        self.assertContains(response, 'decoding="async"', count=2)
+        self.assertContains(response, 'loading="lazy"', count=1)
+
+    def test_backfill_image_sizes(self):
+        """Проверяет, что команда сохраняет размеры старых картинок."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=jpeg((30, 20))
+        )
+        self.assertIsNone(post.image_width)
+        out = StringIO()
+        call_command('backfill_image_sizes', stdout=out)
+        self.assertIn('Сохранены размеры картинок: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (30, 20))
+
+    def test_srcset_and_accept_negotiation(self):
+        """Проверяет, что карточка выводит srcset, а картинка отдаётся
+        в формате, выбранном по Accept."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=small_gif()
+        )
+        call_command('render_derivatives', stdout=StringIO())
+        response = self.authorized_client.get(reverse('posts:index'))
+        image_url = reverse('posts:post_image', args=[post.pk, 'card', 480])
+        self.assertContains(response, image_url)
+        self.assertContains(response, 'sizes="')
+        response = self.authorized_client.get(
+            image_url, HTTP_ACCEPT='image/webp,image/*;q=0.8'
+        )
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('Accept', response['Vary'])
+        self.assertTrue(b''.join(response.streaming_content))
+        for args in ([post.pk, 'card', 100], [post.pk, 'huge', 480]):
+            with self.subTest(args=args):
+                response = self.authorized_client.get(
+                    reverse('posts:post_image', args=args)
+                )
+                self.assertEqual(response.status_code, 404)
+
+    @mock.patch('posts.images.FORMATS', ('AVIF', 'WEBP', 'JPEG'))
+    def test_accepted_formats(self):
+        """Проверяет выбор форматов по заголовку Accept."""
+        cases = {
+            'image/avif,image/webp,*/*;q=0.8': ['AVIF', 'WEBP', 'JPEG'],
+            'image/webp,image/avif;q=0': ['WEBP', 'JPEG'],
+            '*/*': ['JPEG'],
+            '': ['JPEG'],
+        }
+        for accept, formats in cases.items():
+            with self.subTest(accept=accept):
+                self.assertEqual(accepted_formats(accept), formats)
+
+
+def jpeg(size, exif=None):
+    buffer = BytesIO()
+    params = {'exif': exif} if exif else {}
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', **params)
+    return SimpleUploadedFile(
+        name='photo.jpg', content=buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+def png(size, exif=None, text=None):
+    buffer = BytesIO()
+    pnginfo = PngInfo()
+    for key, value in (text or {}).items():
+        pnginfo.add_text(key, value)
+    params = {'exif': exif} if exif else {}
+    Image.new('RGBA', size, 'red').save(
+        buffer, 'PNG', pnginfo=pnginfo, **params
+    )
+    return SimpleUploadedFile(
+        name='picture.png', content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+def xpm():
+    # Pillow умеет читать XPM, но не записывать.
+    content = (
+        b'/* XPM */\nstatic char *picture[] = {\n'
+        b'"2 2 1 1",\n"a c #FF0000",\n"aa",\n"aa"\n};\n'
+    )
+    return SimpleUploadedFile(
+        name='picture.xpm', content=content, content_type='image/x-xpm'
+    )
+
+
+class TestImageNormalization(TestCase):
+    """Класс для проверки обработки картинок при загрузке."""
+    def clean_image(self, uploaded):
+        form = PostForm({'text': 'Пост'}, files={'image': uploaded})
+        form.is_valid()
+        return form
+
+    def open_cleaned(self, form):
+        return Image.open(form.cleaned_data['image'])
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_pixel_bomb_rejected(self):
+        """Проверяет, что слишком большая картинка отклоняется."""
+        form = self.clean_image(jpeg((20, 20)))
+        self.assertIn('image', form.errors)
+
+    @override_settings(IMAGE_MAX_EDGE=10)
+    def test_long_edge_capped(self):
+        """Проверяет, что картинка уменьшается по длинной стороне."""
+        image = self.open_cleaned(self.clean_image(jpeg((40, 20))))
+        self.assertEqual(image.size, (10, 5))
+
+    def test_exif_applied_and_stripped(self):
+        """Проверяет, что картинка поворачивается по EXIF, а метаданные
+        удаляются."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Телефон'
+        image = self.open_cleaned(self.clean_image(jpeg((40, 20), exif)))
+        self.assertEqual(image.size, (20, 40))
+        self.assertFalse(image.getexif())
+
+    def test_png_metadata_stripped(self):
+        """Проверяет, что из PNG удаляются EXIF и текстовые поля, а
+        прозрачность остаётся."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Телефон'
+        image = self.open_cleaned(self.clean_image(
+            png((40, 20), exif, {'Comment': 'Секрет'})
+        ))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (20, 40))
+        self.assertEqual(image.mode, 'RGBA')
+        self.assertFalse(image.getexif())
+        self.assertNotIn('Comment', image.info)
+
+    def test_read_only_format_converted(self):
+        """Проверяет, что картинка в формате, который Pillow не умеет
+        записывать, перекодируется в PNG."""
+        form = self.clean_image(xpm())
+        self.assertTrue(form.is_valid(), form.errors)
+        uploaded = form.cleaned_data['image']
+        self.assertEqual(uploaded.name, 'picture.png')
+        image = Image.open(uploaded)
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.size, (2, 2))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestContentAddressedStorage(TransactionTestCase):
+    """Класс для проверки хранения картинок по хэшу содержимого."""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='auth',
+        )
+
+    def test_identical_uploads_share_file(self):
+        """Проверяет, что одинаковые картинки хранятся одним файлом,
+        который удаляется вместе с последней ссылкой."""
+        first, second = (
+            Post.objects.create(
+                text='Пост с картинкой', author=self.user, image=small_gif()
+            )
+            for _ in range(2)
+        )
+        name = first.image.name
+        self.assertRegex(
+            name, r'^posts/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.gif$'
+        )
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(StoredImage.objects.get(name=name).references, 2)
+        first.delete()
+        self.assertTrue(second.image.storage.exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).references, 1)
+        second.delete()
+        self.assertFalse(second.image.storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_reupload_before_delete_commits_keeps_file(self):
+        """Проверяет, что файл не удаляется, если ту же картинку
+        загрузили заново до фиксации удаления последнего поста."""
+        post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=small_gif()
+        )
+        name = post.image.name
+        with transaction.atomic():
+            post.delete()
+            again = Post.objects.create(
+                text='Тот же пост', author=self.user, image=small_gif()
+            )
+        self.assertEqual(again.image.name, name)
+        self.assertTrue(again.image.storage.exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).references, 1)
@@ -0,0 +1,77 @@
+import random
+
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+from posts import load
+from posts.models import Post
+from posts.seed import seed
+
+from yatube.wsgi import application
+
+
+class TestLoadDriver(TransactionTestCase):
+    """Класс для проверки нагрузочного прогона через локальный
+    сервер."""
+    def setUp(self):
+        cache.clear()
+        seed(users=5, groups=2, posts=20, comments=20, follows=10)
+        self.server = load.start_server(application, workers=2)
+        host, port = self.server.server_address[:2]
+        self.base_url = f'http://{host}:{port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def virtual_client(self, password='yatube-seed'):
+        return load.VirtualClient(
+            self.base_url, load.Dataset('seed_user_'), load.Recorder(),
+            random.Random(0), 'seed_user_0', password,
+        )
+
+    def test_drive_reports_latency_per_url_name(self):
+        """Проверяет, что клиенты входят, читают ленты и пишут посты,
+        а отчёт группирует задержки по именам адресов."""
+        report = load.drive(
+            self.base_url, clients=4, duration=1,
+            mix={'browse': 1, 'follow': 1, 'comment': 1, 'post': 1},
+        )
+        self.assertGreater(report['requests'], 0)
+        self.assertIn('users:login', report['urls'])
+        self.assertIn('posts:follow_index', report['urls'])
+        for name, row in report['urls'].items():
+            self.assertEqual(row['errors'], 0, f'Ошибки на {name}')
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        self.assertTrue(
+            Post.objects.filter(text__startswith='Нагрузочный').exists(),
+            'Клиенты не создали ни одного поста',
+        )
+
+    def test_failed_login_is_error(self):
+        """Проверяет, что повторный показ формы входа и отправка формы
+        без входа на страницу логина считаются ошибками."""
+        client = self.virtual_client(password='wrong')
+        client.login()
+        client.comment()
+        errors = client.recorder.report(1)['urls']
+        self.assertEqual(errors['users:login']['errors'], 1)
+        self.assertEqual(errors['posts:add_comment']['errors'], 1)
+
+    def test_unexpected_redirect_is_error(self):
+        """Проверяет, что перенаправление не на ожидаемый адрес
+        считается ошибкой."""
+        client = self.virtual_client()
+        client.login()
+        client.post_form(reverse('posts:post_create'), {'text': 'Текст'},
+                         location=reverse('posts:index'))
+        rows = client.recorder.report(1)['urls']
+        self.assertEqual(rows['users:login']['errors'], 0)
+        self.assertEqual(rows['posts:post_create']['errors'], 1)
+
+    def test_parse_mix(self):
+        """Проверяет разбор смеси действий."""
+        self.assertEqual(load.parse_mix('browse=3,post=1'),
+                         {'browse': 3.0, 'post': 1.0})
+        with self.assertRaises(ValueError):
+            load.parse_mix('hack=1')
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+from .utils import QueryBudgetMixin
+
+User = get_user_model()
+
+FEED_QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 5,
+    'posts:profile': 7,
+    'posts:follow_index': 5,
+}
+
+
+class TestFeedQueryBudget(QueryBudgetMixin, TestCase):
+    """Класс для проверки числа запросов на страницах лент."""
+    AUTHOR_COUNT = 5
+    POST_COUNT = 15
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='reader',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create(
+                username=f'author_{i}',
+                first_name='Имя',
+                last_name=f'Фамилия {i}',
+            )
+            for i in range(cls.AUTHOR_COUNT)
+        ]
+        for i in range(cls.POST_COUNT):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.authors[i % cls.AUTHOR_COUNT],
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=post, author=cls.user, text='Тестовый коммент'
+            )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_query_budget(self):
+        """Проверяет, что ленты не делают запросов на каждый пост."""
+        adresses = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=[self.group.slug]),
+            'posts:profile': reverse(
+                'posts:profile', args=[self.authors[0].username]),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+        for name, adress in adresses.items():
+            with self.subTest(adress=adress):
+                response = self.assertQueryBudget(
+                    self.authorized_client, adress, FEED_QUERY_BUDGETS[name]
+                )
+                self.assertContains(response, 'Комментарии 1')
+
+
+class TestCommentsPagination(QueryBudgetMixin, TestCase):
+    """Класс для проверки постраничного вывода комментариев."""
+    COMMENT_COUNT = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='auth',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create(username=f'reader_{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(cls.COMMENT_COUNT)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_comments_paginated(self):
+        """Проверяет, что комментарии выводятся страницами от новых
+        к старым, а следующая страница подгружается отдельно."""
+        response = self.assertQueryBudget(
+            self.guest_client,
+            reverse('posts:post_datail', args=[self.post.pk]),
+            3,
+        )
+        first = response.context['comments']
+        newest = self.comments[::-1]
+        self.assertEqual(list(first), newest[:20])
+        self.assertContains(response, 'data-load-more')
+        response = self.assertQueryBudget(
+            self.guest_client,
+            reverse('posts:post_comments', args=[self.post.pk])
+            + f'?after={first.next_cursor}',
+            2,
+        )
+        self.assertEqual(list(response.context['comments']), newest[20:])
+        self.assertContains(response, 'reader_0')
+        self.assertNotContains(response, 'data-load-more')
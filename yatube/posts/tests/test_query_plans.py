@@ -0,0 +1,98 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+def plan_problems(sql):
+    """Возвращает строки плана запроса с полным перебором таблицы или
+    сортировкой во временном B-дереве."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        detail for detail in details
+        if 'TEMP B-TREE' in detail
+        or (detail.startswith('SCAN') and 'INDEX' not in detail)
+    ]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class TestQueryPlans(TestCase):
+    """Класс для проверки планов запросов страниц на индексы."""
+    AUTHOR_COUNT = 5
+    POST_COUNT = 30
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='reader',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.authors = [
+            User.objects.create(username=f'author_{i}')
+            for i in range(cls.AUTHOR_COUNT)
+        ]
+        for i in range(cls.POST_COUNT):
+            post = Post.objects.create(
+                text=f'Тестовый пост {i}',
+                author=cls.authors[i % cls.AUTHOR_COUNT],
+                group=cls.group if i % 2 else None,
+            )
+            Comment.objects.create(
+                post=post, author=cls.user, text='Тестовый коммент'
+            )
+        cls.post = post
+        for author in cls.authors:
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_page_queries(self, adress):
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(adress)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+        ]
+
+    def test_page_queries_use_indexes(self):
+        """Проверяет, что запросы страниц не перебирают таблицы целиком
+        и не сортируют во временном B-дереве."""
+        author = self.authors[0].username
+        adresses = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[author]),
+            reverse('posts:post_datail', args=[self.post.pk]),
+            reverse('posts:post_comments', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        ]
+        for adress in list(adresses):
+            page = self.authorized_client.get(adress).context.get('page_obj')
+            if '?' not in adress and getattr(page, 'next_cursor', None):
+                adresses.append(f'{adress}?after={page.next_cursor}')
+        for adress in adresses:
+            for sql in self.get_page_queries(adress):
+                with self.subTest(adress=adress, sql=sql):
+                    self.assertEqual(
+                        plan_problems(sql), [],
+                        'Запрос не использует индекс'
+                    )
@@ -0,0 +1,162 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from posts import load, replay
+from posts.models import Comment, Post
+from posts.seed import seed
+
+from yatube.wsgi import application
+
+LOG = [
+    {'method': 'GET', 'path': '/', 'user': '-',
+     'timestamp': '2026-01-01T12:00:00+00:00'},
+    {'method': 'GET', 'path': '/posts/987654/', 'user': None,
+     'timestamp': '2026-01-01T12:00:00.200000+00:00'},
+    {'method': 'GET', 'path': '/profile/alice/', 'user': 'bob',
+     'timestamp': '2026-01-01T12:00:00.400000+00:00'},
+    {'method': 'GET', 'path': '/follow/', 'user': 'alice',
+     'timestamp': '2026-01-01T12:00:00.600000+00:00'},
+    {'method': 'POST', 'path': '/posts/987654/comment', 'user': 'alice',
+     'timestamp': '2026-01-01T12:00:00.800000+00:00'},
+]
+
+
+class TestReplay(TransactionTestCase):
+    """Класс для проверки воспроизведения журнала запросов."""
+    def setUp(self):
+        cache.clear()
+        seed(users=5, groups=2, posts=20, comments=5, follows=5)
+        self.server = load.start_server(application, workers=1)
+        host, port = self.server.server_address[:2]
+        self.base_url = f'http://{host}:{port}'
+        self.log_path = self.write_log(LOG)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def write_log(self, entries):
+        log = tempfile.NamedTemporaryFile(
+            'w', suffix='.ndjson', delete=False, encoding='utf-8'
+        )
+        with log:
+            for entry in entries:
+                log.write(json.dumps(entry) + '\n')
+        self.addCleanup(os.remove, log.name)
+        return log.name
+
+    def test_replay_maps_log_onto_seeded_data(self):
+        """Проверяет, что пути и пользователи журнала переносятся на
+        данные базы и все запросы выполняются без ошибок."""
+        report = replay.replay(self.base_url, self.log_path, speed=0)
+        self.assertIn('posts:post_datail', report['urls'])
+        self.assertIn('posts:profile', report['urls'])
+        self.assertIn('posts:follow_index', report['urls'])
+        self.assertIn('posts:add_comment', report['urls'])
+        for name, row in report['urls'].items():
+            self.assertEqual(row['errors'], 0, f'Ошибки на {name}')
+        self.assertTrue(
+            Comment.objects.filter(text='Комментарий из журнала').exists(),
+            'Комментарий из журнала не создан',
+        )
+
+    def test_redirects_and_auth_lines(self):
+        """Проверяет, что перенаправления подписки и гостей на вход не
+        считаются ошибками, а выход и вход из журнала пропускаются и не
+        разлогинивают клиента."""
+        entries = [
+            {'method': 'GET', 'path': '/profile/alice/follow/',
+             'user': 'bob'},
+            {'method': 'GET', 'path': '/auth/logout/', 'user': 'bob'},
+            {'method': 'POST', 'path': '/auth/login/', 'user': 'bob'},
+            {'method': 'GET', 'path': '/follow/', 'user': 'bob'},
+            {'method': 'GET', 'path': '/profile/alice/unfollow/',
+             'user': 'bob', 'status': 302},
+            {'method': 'GET', 'path': '/follow/', 'user': '-'},
+            {'method': 'POST', 'path': '/posts/987654/edit/',
+             'user': 'bob'},
+        ]
+        for number, entry in enumerate(entries):
+            entry['timestamp'] = number
+        report = replay.replay(
+            self.base_url, self.write_log(entries), speed=0
+        )
+        self.assertEqual(report['skipped'], 2)
+        self.assertNotIn('users:logout', report['urls'])
+        self.assertIn('posts:profile_follow', report['urls'])
+        self.assertIn('posts:post_edit', report['urls'])
+        for name, row in report['urls'].items():
+            self.assertEqual(row['errors'], 0, f'Ошибки на {name}')
+        self.assertEqual(report['urls']['posts:follow_index']['requests'], 2)
+
+    def test_mapper_is_stable(self):
+        """Проверяет, что один и тот же объект журнала всегда
+        переносится на один и тот же объект базы."""
+        mapper = replay.Mapper(load.Dataset('seed_user_'))
+        path = mapper.path('/posts/987654/?after=x')
+        self.assertEqual(path, mapper.path('/posts/987654/?after=x'))
+        post_id = int(path.split('/')[2])
+        self.assertTrue(Post.objects.filter(pk=post_id).exists())
+        self.assertTrue(path.endswith('?after=x'))
+        self.assertIsNone(mapper.user('-'))
+        self.assertEqual(mapper.user('alice'), mapper.user('alice'))
+        self.assertEqual(mapper.path('/no/such/page/'), '/no/such/page/')
+
+
+class TestReplayerQueue(TestCase):
+    """Класс для проверки ограничения очереди воспроизведения."""
+    def test_log_is_read_as_requests_complete(self):
+        """Проверяет, что в работе не больше clients записей и журнал
+        не читается наперёд целиком."""
+        read, ahead = [], []
+
+        def entries():
+            for number in range(50):
+                read.append(number)
+                yield {'timestamp': 0, 'number': number}
+
+        def send(entry):
+            ahead.append(len(read) - entry['number'])
+            time.sleep(0.001)
+
+        replayer = replay.Replayer('http://testserver', None, None,
+                                   clients=2, speed=0)
+        replayer.send = send
+        replayer.run(entries())
+        self.assertEqual(len(ahead), 50)
+        self.assertLessEqual(max(ahead), 3)
+
+    def test_errors_are_raised(self):
+        """Проверяет, что ошибка отправки записи не теряется."""
+        def send(entry):
+            raise ValueError('Ошибка отправки')
+
+        replayer = replay.Replayer('http://testserver', None, None,
+                                   clients=2, speed=0)
+        replayer.send = send
+        with self.assertRaises(ValueError):
+            replayer.run({'timestamp': 0} for _ in range(10))
+
+
+class TestReplayCompare(TestCase):
+    """Класс для проверки сравнения двух прогонов."""
+    def test_compare_flags_regressions(self):
+        """Проверяет, что рост p95 сверх порога считается регрессией,
+        а новые адреса — нет."""
+        def row(p50, p95):
+            return {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p95}
+
+        before = {'urls': {'posts:index': row(10, 20),
+                           'posts:profile': row(10, 20)}}
+        after = {'urls': {'posts:index': row(10, 30),
+                          'posts:profile': row(11, 21),
+                          'posts:search': row(50, 90)}}
+        rows, regressions = replay.compare(before, after, 0.25)
+        self.assertEqual(regressions, ['posts:index'])
+        self.assertEqual([r['url'] for r in rows],
+                         ['posts:index', 'posts:profile', 'posts:search'])
+        self.assertAlmostEqual(rows[0]['change']['p95_ms'], 0.5)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Post
+from posts.paginators import encode_cursor
+
+User = get_user_model()
+
+
+class TestSearch(TestCase):
+    """Класс для проверки полнотекстового поиска."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+        )
+        cls.post = Post.objects.create(
+            text='Рецепт борща со сметаной',
+            author=cls.user,
+        )
+        cls.other = Post.objects.create(
+            text='Заметки о путешествии',
+            author=cls.user,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['page_obj']
+
+    def test_search_posts_and_comments(self):
+        """Проверяет, что поиск находит посты по тексту и по
+        комментариям, а изменения попадают в индекс."""
+        self.assertEqual(list(self.search('БОРЩ')), [self.post])
+        self.assertEqual(list(self.search('путешеств')), [self.other])
+        comment = Comment.objects.create(
+            post=self.other, author=self.user, text='Борщ в дороге'
+        )
+        self.assertEqual(set(self.search('борщ')), {self.post, self.other})
+        comment.delete()
+        self.post.text = 'Рецепт щей'
+        self.post.save()
+        self.assertEqual(list(self.search('борщ')), [])
+        self.assertEqual(list(self.search('щей')), [self.post])
+
+    def test_search_empty_query(self):
+        """Проверяет, что пустой запрос и запрос из знаков препинания
+        не ломают страницу."""
+        self.assertEqual(list(self.search('')), [])
+        self.assertEqual(list(self.search('"*(')), [])
+
+    def test_search_broken_cursor(self):
+        """Проверяет, что курсор с битым или слишком большим id
+        открывает первую страницу."""
+        for pk in ('x', '-1', str(10 ** 20)):
+            with self.subTest(pk=pk):
+                page = self.search('борщ', after=encode_cursor('-1.0', pk))
+                self.assertEqual(list(page), [self.post])
+
+    def test_search_ranked_cursor_pages(self):
+        """Проверяет, что результаты упорядочены по релевантности
+        и листаются курсором без повторов."""
+        posts = [
+            Post.objects.create(
+                text='суп ' * (i + 1) + 'обед ' * 20, author=self.user
+            )
+            for i in range(12)
+        ]
+        first = self.search('суп')
+        self.assertEqual(list(first), posts[::-1][:10])
+        second = self.search('суп', after=first.next_cursor)
+        self.assertEqual(list(second), posts[::-1][10:])
+        self.assertIsNone(second.next_cursor)
+        back = self.search('суп', before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_admin_search_uses_index(self):
+        """Проверяет, что поиск в админке находит посты по индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'борщ'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.post]
+        )
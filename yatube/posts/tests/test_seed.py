@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.seed import SEED_END
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestSeed(TestCase):
+    """Класс для проверки генератора синтетических данных."""
+    SCALE = ('--users=30', '--groups=3', '--posts=200', '--comments=300',
+             '--follows=150', '--batch-size=50')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def seed(self, *args):
+        call_command('seed_yatube', *self.SCALE, *args, stdout=StringIO())
+
+    def dates(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'pub_date', flat=True)),
+            list(Comment.objects.order_by('pk').values_list(
+                'created', flat=True)),
+            list(User.objects.order_by('pk').values_list(
+                'date_joined', flat=True)),
+        )
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'author__username', 'group__slug')),
+            sorted(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        )
+
+    def test_seed_creates_requested_scale(self):
+        """Проверяет, что создаётся заданное число строк, а счётчики
+        пересобраны."""
+        self.seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 150)
+        post = Post.objects.annotate(total=Count('comment')).first()
+        self.assertEqual(post.comment_count, post.total)
+        self.assertTrue(
+            self.client.login(username='seed_user_0', password='yatube-seed')
+        )
+
+    def test_author_popularity_is_skewed(self):
+        """Проверяет, что самый популярный автор собирает заметно больше
+        постов и подписчиков, чем медианный."""
+        self.seed()
+        posts = sorted(UserStats.objects.values_list(
+            'posts_count', flat=True), reverse=True)
+        followers = sorted(UserStats.objects.values_list(
+            'followers_count', flat=True), reverse=True)
+        self.assertGreater(posts[0], 4 * posts[len(posts) // 2])
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+
+    def test_seed_is_deterministic(self):
+        """Проверяет, что один и тот же seed даёт те же данные."""
+        self.seed('--seed=7')
+        first = self.snapshot()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        self.seed('--seed=7')
+        self.assertEqual(self.snapshot(), first)
+
+    def test_dates_do_not_depend_on_run_time(self):
+        """Проверяет, что даты набора отсчитываются от --end, а не от
+        времени запуска."""
+        self.seed('--seed=7')
+        dates = self.dates()
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        later = timezone.now() + timedelta(days=3)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.seed('--seed=7')
+        self.assertEqual(self.dates(), dates)
+        self.assertLessEqual(max(dates[0]), SEED_END)
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        self.seed('--seed=7', '--end=2020-06-01', '--prefix=old')
+        self.assertLessEqual(
+            Post.objects.latest('pub_date').pub_date,
+            datetime(2020, 6, 1, tzinfo=timezone.utc),
+        )
+
+    def test_image_posts_optional(self):
+        """Проверяет, что картинки появляются только по запросу и с
+        размерами."""
+        self.seed()
+        self.assertFalse(Post.objects.exclude(image='').exists())
+        Post.objects.all().delete()
+        self.seed('--image-ratio=0.5', '--images=2', '--prefix=img')
+        with_image = Post.objects.exclude(image='')
+        self.assertTrue(with_image.exists())
+        self.assertFalse(with_image.filter(image_width__isnull=True).exists())
@@ -0,0 +1,134 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class TestTimeline(TestCase):
+    """Класс для проверки материализованной ленты подписок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='user',
+        )
+        cls.author = User.objects.create(
+            username='auth',
+        )
+        cls.other = User.objects.create(
+            username='other',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_feed(self, params=None):
+        response = self.authorized_client.get(
+            reverse('posts:follow_index'), params or {}
+        )
+        return response.context['page_obj']
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """Проверяет, что подписка заполняет ленту, а отписка
+        очищает её."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user, post=self.post).exists())
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user).exists()
+        )
+
+    def test_new_post_fans_out_to_followers(self):
+        """Проверяет, что новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        self.assertEqual(list(self.get_feed()), [post, self.post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_celebrity_posts_merged_on_read(self):
+        """Проверяет, что посты популярного автора не раздаются
+        по лентам, а подмешиваются при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        cache.clear()
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+            for i in range(12)
+        ]
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__in=posts).exists())
+        first_page = self.get_feed()
+        second_page = self.get_feed({'after': first_page.next_cursor})
+        self.assertEqual(
+            list(first_page) + list(second_page),
+            posts[::-1] + [self.post],
+        )
+
+    def test_migration_fills_existing_follows(self):
+        """Проверяет, что миграция заполняет ленты подписок, сделанных
+        до появления TimelineEntry."""
+        Follow.objects.bulk_create([
+            Follow(user=self.user, author=self.author),
+            Follow(user=self.other, author=self.author),
+        ])
+        migration = import_module('posts.migrations.0017_fill_timelines')
+        migration.fill_timelines(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(list(self.get_feed()), [self.post])
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_rebuild_command_skips_celebrities(self):
+        """Проверяет, что команда дополняет ленты, а записи популярных
+        авторов убирает."""
+        Follow.objects.bulk_create([
+            Follow(user=self.user, author=self.author),
+            Follow(user=self.user, author=self.other),
+        ])
+        post = Post.objects.create(text='Пост', author=self.other)
+        TimelineEntry.objects.create(
+            user=self.other, post=self.post, pub_date=self.post.pub_date
+        )
+        UserStats.objects.update_or_create(
+            user=self.author, defaults={'followers_count': 2}
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.user.pk, post.pk)],
+        )
+        self.assertEqual(list(self.get_feed()), [post, self.post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_crossing_limit_moves_author_entries(self):
+        """Проверяет, что записи автора убираются из лент, когда он
+        становится популярным, и возвращаются, когда перестаёт."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertTrue(TimelineEntry.objects.exists())
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=self.other).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user', 'post')),
+            {(self.user.pk, self.post.pk), (self.user.pk, post.pk)},
+        )
+        self.assertEqual(list(self.get_feed()), [post, self.post])
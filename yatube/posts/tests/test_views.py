@@ -7,7 +7,8 @@ from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import encode_cursor, feed_count_cache_key
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
@@ -158,12 +159,33 @@ class TestViewsFunc(TestCase):
         count_response_posts = len(response.context['page_obj'])
         self.assertEqual(count_response_posts, count_posts + 1)
         content_page = response.content
-        Post.objects.get(text='Тестовый пост 2').delete()
+        Post.objects.filter(text='Тестовый пост 2').update(text='Изменён')
         response = self.authorized_client.get(reverse_name)
-        self.assertEqual(response.content, content_page)
-        cache.clear()
+        self.assertEqual(
+            response.content,
+            content_page,
+            'Главная страница не берётся из кэша',
+        )
+        Post.objects.get(text='Изменён').delete()
+        response = self.authorized_client.get(reverse_name)
+        self.assertNotEqual(
+            response.content,
+            content_page,
+            'Удаление поста не сбрасывает кэш главной страницы',
+        )
+
+    def test_cache_index_invalidated_by_comment(self):
+        """Проверяет, что новый комментарий сбрасывает кэш ленты."""
+        reverse_name = reverse('posts:index')
+        content_page = self.authorized_client.get(reverse_name).content
+        Comment.objects.create(
+            post=TestViewsFunc.post,
+            author=TestViewsFunc.user,
+            text='Тестовый коммент',
+        )
         response = self.authorized_client.get(reverse_name)
         self.assertNotEqual(response.content, content_page)
+        self.assertContains(response, 'Комментарии 1')
 
 
 class TestPaginatorView(TestCase):
@@ -231,6 +253,160 @@ class TestPaginatorView(TestCase):
                     f'Паджинатор {reverse_name} работает не правильно'
                 )
 
+    def test_cache_index_depends_on_page(self):
+        """Проверяет, что кэш главной страницы учитывает номер страницы."""
+        reverse_name = reverse('posts:index')
+        first_page = self.authorized_client.get(reverse_name)
+        second_page = self.authorized_client.get(reverse_name, {'page': 2})
+        self.assertNotEqual(first_page.content, second_page.content)
+        self.assertContains(second_page, 'Тестовый пост 0')
+        self.assertNotContains(first_page, 'Тестовый пост 0<')
+
+
+class TestCursorPaginatorView(TestCase):
+    """Класс для проверки паджинации по курсору."""
+    PAGE_SIZE = 10
+    POST_COUNT = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+        )
+        Post.objects.bulk_create(
+            [Post(text=f'Тестовый пост {i}', author=cls.user)
+             for i in range(cls.POST_COUNT)]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_pages_cover_feed(self):
+        """Проверяет, что переход по курсорам проходит всю ленту
+        без пропусков и повторов."""
+        response = self.guest_client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        seen = [post.pk for post in page_obj]
+        while page_obj.next_cursor:
+            response = self.guest_client.get(
+                reverse('posts:index'), {'after': page_obj.next_cursor}
+            )
+            page_obj = response.context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+        self.assertEqual(seen, expected, 'Курсоры теряют или дублируют посты')
+
+    def test_new_post_does_not_shift_page(self):
+        """Проверяет, что новый пост не сдвигает страницу по курсору."""
+        first_page = self.guest_client.get(
+            reverse('posts:index')).context['page_obj']
+        adress = reverse('posts:index')
+        params = {'after': first_page.next_cursor}
+        before = [post.pk for post in self.guest_client.get(
+            adress, params).context['page_obj']]
+        Post.objects.create(text='Свежий пост', author=self.user)
+        after = [post.pk for post in self.guest_client.get(
+            adress, params).context['page_obj']]
+        self.assertEqual(before, after)
+        self.assertEqual(len(after), self.PAGE_SIZE)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Проверяет, что курсор before возвращает предыдущую страницу."""
+        adress = reverse('posts:index')
+        first_page = self.guest_client.get(adress).context['page_obj']
+        second_page = self.guest_client.get(
+            adress, {'after': first_page.next_cursor}).context['page_obj']
+        previous_page = self.guest_client.get(
+            adress, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверяет, что битый курсор открывает первую страницу."""
+        cursors = (
+            'not-a-cursor',
+            encode_cursor('2020-01-01T00:00:00+00:00', 10 ** 20),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'after': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), self.PAGE_SIZE)
+                self.assertIsNone(page_obj.previous_cursor)
+
+
+class TestFeedPaginatorView(TestCase):
+    """Класс для проверки окна навигации и счётчиков ленты."""
+    POST_COUNT = 95
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(
+            username='auth',
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            [Post(text=f'Тестовый пост {i}', author=cls.user)
+             for i in range(cls.POST_COUNT)]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_page_window(self):
+        """Проверяет, что в навигации выводится только окно страниц."""
+        windows = {
+            1: range(1, 5),
+            5: range(2, 9),
+            10: range(7, 11),
+        }
+        for number, window in windows.items():
+            with self.subTest(number=number):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'page': number}
+                )
+                self.assertEqual(
+                    response.context['page_obj'].page_window, window
+                )
+
+    def test_count_is_cached_and_kept_by_signals(self):
+        """Проверяет, что счётчик ленты берётся из кэша
+        и обновляется при создании и удалении поста."""
+        self.guest_client.get(reverse('posts:index'))
+        key = feed_count_cache_key('posts')
+        self.assertEqual(cache.get(key), self.POST_COUNT)
+        post = Post.objects.create(
+            text='Новый пост', author=self.user, group=self.group
+        )
+        self.assertEqual(cache.get(key), self.POST_COUNT + 1)
+        post.delete()
+        self.assertEqual(cache.get(key), self.POST_COUNT)
+
+    def test_count_follows_group_change(self):
+        """Проверяет, что счётчик группы учитывает перенос поста."""
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        adress = reverse('posts:group_list', args=[self.group.slug])
+        self.guest_client.get(adress)
+        key = feed_count_cache_key(f'group:{self.group.pk}')
+        self.assertEqual(cache.get(key), 0)
+        post.group = self.group
+        post.save()
+        self.assertEqual(cache.get(key), 1)
+
 
 class TestCreatePost(TestCase):
     """Класс для проверки функция создания постов."""
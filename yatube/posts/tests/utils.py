@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Примесь для TestCase, проверяющая число запросов к базе."""
+    def assertQueryBudget(self, client, adress, budget):
+        """Запрашивает adress и проверяет, что страница уложилась
+        в budget запросов к базе. Возвращает ответ."""
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(adress)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context),
+            budget,
+            f'Страница {adress} сделала {len(context)} запросов '
+            f'при бюджете {budget}:\n{queries}',
+        )
+        return response
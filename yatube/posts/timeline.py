@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CursorPaginator
+
+CELEBRITIES_CACHE_KEY = 'timeline_celebrities'
+
+
+def celebrity_ids():
+    """Возвращает id авторов, посты которых не раздаются по лентам.
+
+    У таких авторов не меньше TIMELINE_FANOUT_LIMIT подписчиков, и их
+    посты подмешиваются в ленту подписок при чтении."""
+    return cache.get_or_set(
+        CELEBRITIES_CACHE_KEY,
+        lambda: set(
+            UserStats.objects.filter(
+                followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        ),
+        settings.TIMELINE_CELEBRITIES_TIMEOUT,
+    )
+
+
+def _insert_entries(entries):
+    # Размер запроса выбирает Django: явный batch_size больше лимитов
+    # SQLite на число строк в одном INSERT приводит к ошибке.
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def _in_batches(rows, make_entry):
+    batch = []
+    for row in rows:
+        batch.append(make_entry(row))
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            _insert_entries(batch)
+            batch = []
+    if batch:
+        _insert_entries(batch)
+
+
+def fan_out_post(post_id):
+    """Раздаёт новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None or post['author_id'] in celebrity_ids():
+        return
+    followers = Follow.objects.filter(
+        author_id=post['author_id']
+    ).values_list('user_id', flat=True)
+    _in_batches(followers.iterator(), lambda user_id: TimelineEntry(
+        user_id=user_id, post_id=post_id, pub_date=post['pub_date']
+    ))
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя посты автора после подписки."""
+    if author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _in_batches(posts.iterator(), lambda row: TimelineEntry(
+        user_id=user_id, post_id=row[0], pub_date=row[1]
+    ))
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(author_id=None):
+    """Дополняет ленты всех подписчиков постами их авторов, например
+    после загрузки подписок и постов в обход сигналов. Уже
+    существующие записи пропускаются, а записи популярных авторов
+    удаляются: их посты подмешиваются при чтении. С author_id
+    пересобираются только записи этого автора.
+
+    Записи вставляются одним запросом INSERT ... SELECT: при миллионах
+    записей обход подписок в Python занял бы часы."""
+    entry_table = TimelineEntry._meta.db_table
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    celebrities = list(celebrity_ids())
+    entries = TimelineEntry.objects.filter(post__author_id__in=celebrities)
+    if author_id is not None:
+        entries = entries.filter(post__author_id=author_id)
+    entries.delete()
+    conditions, params = '', []
+    if celebrities:
+        conditions = 'AND follow.author_id NOT IN ({}) '.format(
+            ', '.join(['%s'] * len(celebrities))
+        )
+        params = celebrities
+    if author_id is not None:
+        conditions += 'AND follow.author_id = %s '
+        params.append(author_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '{insert} {table} (user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            'FROM {follows} follow, {posts} post '
+            'WHERE post.author_id = follow.author_id '
+            '{conditions}{suffix}'.format(
+                insert=connection.ops.insert_statement(ignore_conflicts=True),
+                table=entry_table,
+                follows=Follow._meta.db_table,
+                posts=Post._meta.db_table,
+                conditions=conditions,
+                suffix=connection.ops.ignore_conflicts_suffix_sql(
+                    ignore_conflicts=True
+                ),
+            ),
+            params,
+        )
+
+
+def crossed_fanout_limit(author_id, delta):
+    """Проверяет, пересёк ли автор порог TIMELINE_FANOUT_LIMIT после
+    того, как число его подписчиков сдвинулось на delta."""
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return followers == (limit if delta > 0 else limit - 1)
+
+
+class TimelinePaginator(CursorPaginator):
+    """Курсорный паджинатор ленты подписок.
+
+    Сливает материализованную ленту пользователя с постами популярных
+    авторов, на которых он подписан: их посты не раздаются при
+    публикации и выбираются при чтении.
+    """
+    def __init__(self, user, per_page):
+        entries = TimelineEntry.objects.filter(user=user).order_by(
+            '-pub_date', '-post'
+        )
+        super().__init__(entries, per_page)
+        self.user = user
+
+    def fetch(self, stamp, pk, descending):
+        keys = self.fetch_from(
+            self.object_list.values_list('pub_date', 'post_id'),
+            'pub_date', 'post_id', stamp, pk, descending,
+        )
+        celebrities = Follow.objects.filter(
+            user=self.user, author__in=celebrity_ids()
+        ).values_list('author', flat=True)
+        if celebrities:
+            keys += self.fetch_from(
+                Post.objects.filter(
+                    author__in=list(celebrities)
+                ).values_list('pub_date', 'pk'),
+                'pub_date', 'pk', stamp, pk, descending,
+            )
+            keys = sorted(set(keys), reverse=descending)
+        keys = keys[:self.per_page + 1]
+        posts = Post.objects.feed().in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 
 from . import views
 
@@ -12,7 +12,19 @@ urlpatterns = [
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/comment', views.add_comment, name='add_comment'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path(
+        'posts/<int:post_id>/image/<str:kind>/<int:width>/',
+        views.post_image,
+        name='post_image',
+    ),
+    path('search/', views.search, name='search'),
+    path('api/', include('posts.api.urls')),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,38 +1,129 @@
+import hashlib
+
+from core.middleware import add_surrogate_keys
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
+from django.middleware.csrf import get_token
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
 
-from yatube.settings import PAGE_SIZE
+from yatube.settings import (COMMENTS_PAGE_SIZE, FEED_CACHE_TIMEOUT,
+                             IMAGE_CACHE_TIMEOUT, PAGE_SIZE)
 
+from .counters import get_user_stats
+from .feed_cache import (feed_generation, page_epoch, page_generation,
+                         page_modified)
 from .forms import CommentForm, PostForm
+from .images import (DERIVATIVES, MIME_TYPES, accepted_formats, get_derivative,
+                     prefetch_derivatives, schedule_derivatives)
 from .models import Follow, Group, Post, User
+from .paginators import CursorPaginator, FeedPaginator, add_page_cursors
+from .search import SearchPaginator
+from .timeline import TimelinePaginator
+
 
+def collect_paginator(post_list, request, count_key=None):
+    """Разбивает ленту на страницы.
 
-def collect_paginator(post_list, request):
-    paginator = Paginator(post_list, PAGE_SIZE)
+    С параметрами after/before страница выбирается по курсору,
+    иначе по номеру из page. Число записей нумерованной ленты
+    кэшируется по ключу count_key."""
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if after or before:
+        paginator = CursorPaginator(post_list, PAGE_SIZE)
+        return paginator.get_cursor_page(after=after, before=before)
+    paginator = FeedPaginator(
+        post_list.order_by('-pub_date', '-pk'), PAGE_SIZE, count_key
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    return page_obj
+    return add_page_cursors(page_obj)
+
+
+def collect_comments(post, request):
+    """Возвращает страницу комментариев поста от новых к старым.
+
+    Авторы выбираются тем же запросом, более старые комментарии
+    подгружаются по курсору из параметра after."""
+    paginator = CursorPaginator(
+        post.comment.select_related('author').order_by('-created', '-pk'),
+        COMMENTS_PAGE_SIZE,
+        field='created',
+    )
+    return paginator.get_cursor_page(after=request.GET.get('after'))
+
+
+def tag_page(request, page_obj, *keys):
+    """Помечает страницу ленты ключами её постов, авторов и групп."""
+    page_keys = set(keys)
+    for post in page_obj:
+        page_keys.update((f'post:{post.pk}', f'user:{post.author_id}'))
+        if post.group_id is not None:
+            page_keys.add(f'group:{post.group_id}')
+    add_surrogate_keys(request, *page_keys)
 
 
+def page_etag(request, *args, **kwargs):
+    """ETag страницы: поколение страниц, интервал page_epoch и
+    пользователь, для которого она отрисована. Считается без запросов
+    к базе и шаблонов.
+
+    Страницы пользователя содержат CSRF-токен его сессии, поэтому в
+    ETag входят и ключ сессии с секретом CSRF: после нового входа
+    старая копия с чужим токеном не совпадёт."""
+    etag = f'{page_generation()}-{page_epoch()}-{request.user.pk or 0}'
+    if request.user.is_authenticated:
+        # get_token заводит секрет CSRF ещё до отрисовки, и ETag первого
+        # ответа совпадёт со следующим запросом с этим секретом.
+        get_token(request)
+        secret = (
+            f'{request.session.session_key}:{request.META["CSRF_COOKIE"]}'
+        )
+        etag += '-' + hashlib.md5(secret.encode()).hexdigest()[:12]
+    return f'W/"{etag}"'
+
+
+def page_last_modified(request, *args, **kwargs):
+    """Время последнего изменения страниц. Отдаётся только гостям:
+    страница пользователя зависит ещё и от того, кто вошёл."""
+    if request.user.is_authenticated:
+        return None
+    return page_modified()
+
+
+page_condition = condition(
+    etag_func=page_etag, last_modified_func=page_last_modified
+)
+
+
+@page_condition
 def index(request):
     """Рендерит страницу со всеми записями из базы данных."""
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    page_obj = collect_paginator(post_list, request)
+    post_list = Post.objects.feed()
+    page_obj = collect_paginator(post_list, request, 'posts')
+    tag_page(request, page_obj, 'posts')
+    prefetch_derivatives(request, page_obj)
     context = {
         'page_obj': page_obj,
+        'feed_generation': feed_generation(),
+        'feed_cache_timeout': FEED_CACHE_TIMEOUT,
     }
     return render(request, template, context)
 
 
+@page_condition
 def group_posts(request, slug):
     """Рендерит страницу со всеми записями выбранной группы."""
     template = 'posts/group_list.html'
     title = 'Записи сообщества'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = collect_paginator(post_list, request)
+    post_list = group.posts.feed()
+    page_obj = collect_paginator(post_list, request, f'group:{group.pk}')
+    tag_page(request, page_obj, f'group:{group.pk}')
+    prefetch_derivatives(request, page_obj)
     context = {
         'title': title,
         'page_obj': page_obj,
@@ -41,14 +132,18 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@page_condition
 def profile(request, username):
     """Рендерит страничу профиля."""
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
-    page_obj = collect_paginator(post_list, request)
-    count_posts = post_list.count()
-    following_count = Follow.objects.filter(author=author).count
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = Post.objects.feed().filter(author=author)
+    page_obj = collect_paginator(post_list, request, f'author:{author.pk}')
+    tag_page(request, page_obj, f'user:{author.pk}')
+    prefetch_derivatives(request, page_obj)
+    stats = get_user_stats(author)
     following = False
     if request.user.is_authenticated and Follow.objects.filter(
             user=request.user,
@@ -57,22 +152,28 @@ def profile(request, username):
         following = True
     context = {
         'username': username,
-        'count_posts': count_posts,
+        'count_posts': stats.posts_count,
         'page_obj': page_obj,
         'author': author,
         'following': following,
-        'following_count': following_count,
+        'following_count': stats.followers_count,
     }
     return render(request, template, context)
 
 
+@page_condition
 def datail(request, post_id):
     """Рендерит страницу подробной информации о посте."""
     template = 'posts/post_datail.html'
-    post = get_object_or_404(Post, id=post_id)
-    author = get_object_or_404(User, username=post.author.username)
-    count_posts = author.posts.all().count()
-    comments = post.comment.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    author = post.author
+    add_surrogate_keys(request, f'post:{post.pk}', f'user:{author.pk}')
+    if post.group_id is not None:
+        add_surrogate_keys(request, f'group:{post.group_id}')
+    count_posts = get_user_stats(author).posts_count
+    comments = collect_comments(post, request)
     form = CommentForm()
     context = {
         'post': post,
@@ -95,7 +196,9 @@ def post_edit(request, post_id):
         instance=post,
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if post.image and 'image' in form.changed_data:
+            schedule_derivatives(post)
         return redirect('posts:post_datail', post_id=post.id)
     context = {
         'is_edit': True,
@@ -114,6 +217,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            schedule_derivatives(post)
         return redirect('posts:profile', username=post.author)
     context = {
         'is_edit': False,
@@ -122,6 +227,19 @@ def post_create(request):
     return render(request, template, context)
 
 
+def post_comments(request, post_id):
+    """Рендерит следующую страницу комментариев поста для кнопки
+    «Показать ещё»."""
+    template = 'posts/includes/comments.html'
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    add_surrogate_keys(request, f'post:{post.pk}')
+    context = {
+        'post': post,
+        'comments': collect_comments(post, request),
+    }
+    return render(request, template, context)
+
+
 @login_required
 def add_comment(request, post_id):
     """Функция для создания комментария."""
@@ -140,16 +258,52 @@ def follow_index(request):
     """Рендерит страницу с постами от авторов на которых подписан
     пользователь."""
     template = 'posts/follow.html'
-    user = get_object_or_404(User, username=request.user.username)
-    author_list = Follow.objects.filter(
-        user=user
-    ).values_list(
-        'author', flat=True
+    paginator = TimelinePaginator(request.user, PAGE_SIZE)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    prefetch_derivatives(request, page_obj)
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+def post_image(request, post_id, kind, width):
+    """Отдаёт производную картинки поста в лучшем формате, который
+    клиент принимает по заголовку Accept."""
+    if kind not in DERIVATIVES or width not in DERIVATIVES[kind]['widths']:
+        raise Http404
+    post = get_object_or_404(Post.objects.only('image'), pk=post_id)
+    for image_format in accepted_formats(request.META.get('HTTP_ACCEPT', '')):
+        derivative = get_derivative(post.image, kind, width, image_format)
+        if derivative:
+            break
+    else:
+        raise Http404
+    response = FileResponse(
+        derivative.storage.open(derivative.name),
+        content_type=MIME_TYPES[image_format],
+    )
+    patch_vary_headers(response, ['Accept'])
+    patch_cache_control(response, public=True, max_age=IMAGE_CACHE_TIMEOUT)
+    return response
+
+
+def search(request):
+    """Рендерит страницу поиска по постам и комментариям."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    paginator = SearchPaginator(query, PAGE_SIZE)
+    page_obj = paginator.get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
     )
-    follow_post_list = Post.objects.filter(author__in=author_list)
-    page_obj = collect_paginator(follow_post_list, request)
+    prefetch_derivatives(request, page_obj)
     context = {
         'page_obj': page_obj,
+        'query': query,
     }
     return render(request, template, context)
 
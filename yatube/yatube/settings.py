@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +92,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Тестовая база в файле, а не в памяти: SQLite в памяти с общим
+        # кэшем не ждёт снятия блокировки, а сразу падает, и нагрузочный
+        # прогон не мог бы обрабатывать запросы параллельно.
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
@@ -115,6 +122,24 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 PAGE_SIZE = 10
+COMMENTS_PAGE_SIZE = 20
+# Сколько постов JSON API отдаёт за один запрос с параметром ids.
+API_MAX_IDS = 100
+PAGE_WINDOW = 3
+FEED_COUNT_TIMEOUT = 60 * 10
+FEED_CACHE_TIMEOUT = 60 * 5
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 5
+# Поколения страниц для ETag и Last-Modified хранятся в кэше, который у
+# нескольких процессов должен быть общим. Сохранённая клиентом копия
+# подтверждается ответом 304 не дольше PAGE_VALIDATOR_TIMEOUT секунд.
+PAGE_VALIDATOR_TIMEOUT = 60
+# Загружаемые картинки: больше IMAGE_MAX_PIXELS отклоняются, не читая
+# пикселей, остальные уменьшаются до IMAGE_MAX_EDGE по длинной стороне.
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_MAX_EDGE = 2048
+IMAGE_JPEG_QUALITY = 85
+# Адрес картинки меняется вместе с файлом, поэтому её можно кэшировать долго.
+IMAGE_CACHE_TIMEOUT = 60 * 60 * 24 * 365
 
 
 # Internationalization
@@ -143,8 +168,22 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма складываются в очередь и отправляются командой send_outbox
+# через OUTBOX_EMAIL_BACKEND. Неудачная отправка повторяется через
+# OUTBOX_RETRY_DELAY секунд, каждый раз вдвое дольше, но не дольше
+# OUTBOX_RETRY_MAX_DELAY; после OUTBOX_MAX_ATTEMPTS попыток письмо
+# остаётся в очереди с последней ошибкой. Отправщик забирает пачку на
+# OUTBOX_CLAIM_TIMEOUT секунд: пачка должна успеть уйти за это время,
+# иначе её заберёт и отправит повторно другой send_outbox.
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_RETRY_MAX_DELAY = 60 * 60 * 6
+OUTBOX_POLL_INTERVAL = 5
+OUTBOX_CLAIM_TIMEOUT = 60 * 10
 
 
 MEDIA_URL = '/media/'
@@ -159,3 +198,19 @@ CACHES = {
 
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+TEST_RUNNER = 'core.test_runner.EagerTasksRunner'
+
+
+# Фоновые задачи. С TASKS_EAGER=1 в окружении выполняются сразу в потоке
+# запроса; тесты включают это сами через TEST_RUNNER.
+TASKS_EAGER = os.environ.get('TASKS_EAGER') == '1'
+TASKS_WORKERS = 1
+TASKS_PROCESSES = 2
+
+
+# Посты авторов, у которых подписчиков не меньше TIMELINE_FANOUT_LIMIT,
+# не раздаются по лентам подписок, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_CELEBRITIES_TIMEOUT = 60 * 10